@@ -0,0 +1,1007 @@
+import json
+import os
+import sqlite3
+import struct
+import subprocess
+import sys
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+import toolify.audio.audio as audio
+import toolify.audio.features as audio_features
+import toolify.audio.fingerprint as fingerprint
+import toolify.audio.spectrogram as spectrogram
+from toolify.audio import (
+    FeatureStore,
+    build_feature_store,
+    build_fingerprint_index,
+    build_silence_manifest,
+    build_spectrogram_pyramid,
+    compute_spectrogram,
+    compute_stft_memmap,
+    find_duplicates,
+    get_duration_stats,
+    get_envelope_silent_parts,
+    get_level_envelope,
+    get_silent_parts,
+    get_silent_parts_parallel,
+    get_total_duration,
+    iter_silent_parts,
+    render_spectrograms,
+    save_spectrogram_image,
+    split_on_silence,
+    sweep_silence,
+    transcode_directory,
+)
+
+
+SR = 22050
+
+
+def _reference_silent_parts(non_silent, sr, silence_margin_sec):
+    """The original per-sample loop, kept to check the vectorized engine."""
+    margin_samples = int(sr * silence_margin_sec)
+    silent_parts = []
+    is_silent = False
+    start_idx = 0
+
+    for i in range(len(non_silent)):
+        if non_silent[i] and is_silent:
+            end_idx = i - margin_samples
+            start_idx += margin_samples
+            start_time = start_idx / sr
+            end_time = end_idx / sr
+            duration = end_time - start_time + silence_margin_sec * 2
+            silent_parts.append(
+                (start_idx, end_idx, start_time, end_time, duration)
+            )
+            is_silent = False
+        elif not non_silent[i] and not is_silent:
+            start_idx = i
+            is_silent = True
+
+    if is_silent:
+        margin_samples = int(margin_samples * 1.25)
+        end_idx = len(non_silent)
+        start_idx += margin_samples
+        start_time = start_idx / sr
+        end_time = end_idx / sr
+        duration = end_time - start_time + silence_margin_sec * 1.25
+        silent_parts.append((start_idx, end_idx, start_time, end_time, duration))
+    return silent_parts
+
+
+def _tone_with_gaps(sr=SR, pattern=(0.5, 0.4, 0.3, 0.6, 0.2, 0.5)):
+    """Alternate square-wave and silence segments, starting with sound.
+
+    A square wave never crosses zero, so every sound sample is non-silent.
+    """
+    pieces = []
+    for i, seconds in enumerate(pattern):
+        n = int(sr * seconds)
+        if i % 2 == 0:
+            pieces.append(np.where(np.arange(n) % 50 < 25, 0.5, -0.5))
+        else:
+            pieces.append(np.zeros(n))
+    return np.concatenate(pieces).astype(np.float32)
+
+
+@pytest.fixture
+def wav_with_gaps(tmp_path):
+    path = tmp_path / "gaps.wav"
+    sf.write(path, _tone_with_gaps(), SR)
+    return path
+
+
+@pytest.mark.parametrize("margin", [0.0, 0.05, 0.15])
+def test_silent_runs_match_reference_loop(margin):
+    rng = np.random.default_rng(0)
+    non_silent = rng.random(5000) > 0.3
+    non_silent[:40] = False
+    non_silent[-25:] = False
+
+    starts, ends = audio._find_silent_runs(non_silent)
+    parts = audio._build_silent_parts(starts, ends, len(non_silent), SR, margin)
+
+    expected = _reference_silent_parts(non_silent, SR, margin)
+    assert parts.tolist() == expected
+
+
+def test_silent_runs_without_silence_is_empty():
+    starts, ends = audio._find_silent_runs(np.ones(100, dtype=bool))
+    parts = audio._build_silent_parts(starts, ends, 100, SR, 0.15)
+
+    assert len(parts) == 0
+    assert parts.dtype == audio._SILENT_PART_DTYPE
+
+
+def test_get_silent_parts_finds_gaps(wav_with_gaps):
+    parts, y, sr = get_silent_parts(wav_with_gaps)
+
+    assert sr == SR
+    assert len(parts) == 3
+    assert parts[0]["start_sec"] == pytest.approx(0.5 + 0.15, abs=1e-3)
+    assert parts[0]["end_sec"] == pytest.approx(0.9 - 0.15, abs=1e-3)
+    assert parts[1]["duration"] == pytest.approx(0.6, abs=1e-3)
+    assert parts[2]["end_idx"] == len(y)
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1000, 100000])
+def test_iter_silent_parts_matches_whole_signal(block_size):
+    y = _tone_with_gaps(pattern=(0.1, 0.05, 0.02, 0.08, 0.1, 0.03))
+    blocks = (y[i : i + block_size] for i in range(0, len(y), block_size))
+
+    streamed = list(iter_silent_parts(blocks, sample_rate=SR))
+
+    db = librosa.amplitude_to_db(np.abs(y))
+    starts, ends = audio._find_silent_runs(db > -40)
+    expected = audio._build_silent_parts(starts, ends, len(y), SR, 0.15)
+    assert np.array(streamed, dtype=audio._SILENT_PART_DTYPE).tolist() == (
+        expected.tolist()
+    )
+
+
+def test_iter_silent_parts_reads_file_in_blocks(wav_with_gaps):
+    expected, _, _ = get_silent_parts(wav_with_gaps, return_waveform=False)
+
+    streamed = list(iter_silent_parts(wav_with_gaps, block_size=4096))
+
+    assert [tuple(part) for part in streamed] == expected.tolist()
+
+
+@pytest.mark.parametrize("dtype", ["<i2", "<i4", "u1"])
+def test_iter_silent_parts_scales_integer_blocks(dtype):
+    y = _tone_with_gaps()
+    info = np.iinfo(dtype)
+    middle = (int(info.max) + 1) // 2 if info.min == 0 else 0
+    pcm = (np.round(y * (info.max - middle)) + middle).astype(dtype)
+    blocks = (pcm[i : i + 4096] for i in range(0, len(pcm), 4096))
+
+    streamed = list(iter_silent_parts(blocks, sample_rate=SR))
+    expected = list(iter_silent_parts([y], sample_rate=SR))
+
+    assert len(streamed) == len(expected) == 3
+    for part, ref in zip(streamed, expected):
+        assert abs(part["start_idx"] - ref["start_idx"]) <= 256
+
+
+def test_iter_silent_parts_requires_sample_rate_for_blocks():
+    with pytest.raises(ValueError):
+        list(iter_silent_parts([np.zeros(10)]))
+
+
+def test_get_silent_parts_keeps_native_sample_rate(tmp_path):
+    path = tmp_path / "native.wav"
+    sf.write(path, _tone_with_gaps(sr=16000), 16000)
+
+    parts, y, sr = get_silent_parts(path, sr=None)
+
+    assert sr == 16000
+    assert len(y) == sf.info(path).frames
+    assert parts[0]["start_idx"] == int(16000 * 0.5) + int(16000 * 0.15)
+
+
+def test_get_silent_parts_frame_mode_ignores_zero_crossings(tmp_path):
+    t = np.arange(int(SR * 0.5)) / SR
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+    gap = np.zeros(int(SR * 0.5))
+    path = tmp_path / "sine.wav"
+    sf.write(path, np.concatenate([tone, gap, tone, gap]), SR)
+
+    parts, y, _ = get_silent_parts(path, frame_length=2048, hop_length=512)
+
+    assert len(parts) == 2
+    assert parts[0]["start_sec"] == pytest.approx(0.5 + 0.15, abs=2048 / SR)
+    assert parts[0]["end_sec"] == pytest.approx(1.0 - 0.15, abs=2048 / SR)
+    assert parts[1]["end_idx"] == len(y)
+
+
+def test_build_silence_manifest_resumes(tmp_path):
+    audio_dir = tmp_path / "corpus"
+    (audio_dir / "sub").mkdir(parents=True)
+    for name in ["a.wav", "sub/b.wav"]:
+        sf.write(audio_dir / name, _tone_with_gaps(), SR)
+    manifest = tmp_path / "manifest.jsonl"
+
+    stats = build_silence_manifest(audio_dir, manifest, max_workers=2, verbose=False)
+
+    assert stats["processed"] == 2
+    assert stats["failed"] == 0
+    assert stats["audio_hours_per_sec"] > 0
+    entries = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert {os.path.basename(e["path"]) for e in entries} == {"a.wav", "b.wav"}
+    assert len(entries[0]["silent_parts"]) == 3
+
+    sf.write(audio_dir / "a.wav", _tone_with_gaps(pattern=(0.5, 0.5)), SR)
+    os.utime(audio_dir / "a.wav", ns=(0, 0))
+    stats = build_silence_manifest(audio_dir, manifest, max_workers=2, verbose=False)
+
+    assert stats["skipped"] == 1
+    assert stats["processed"] == 1
+    assert len(manifest.read_text().splitlines()) == 2
+
+
+def test_build_silence_manifest_skips_partial_last_line(tmp_path):
+    audio_dir = tmp_path / "corpus"
+    audio_dir.mkdir()
+    for name in ["a.wav", "b.wav"]:
+        sf.write(audio_dir / name, _tone_with_gaps(), SR)
+    manifest = tmp_path / "manifest.jsonl"
+    build_silence_manifest(audio_dir, manifest, max_workers=2, verbose=False)
+
+    lines = manifest.read_text().splitlines()
+    manifest.write_text(lines[0] + "\n" + lines[1][: len(lines[1]) // 2])
+    stats = build_silence_manifest(audio_dir, manifest, max_workers=2, verbose=False)
+
+    assert stats["skipped"] == 1
+    assert stats["processed"] == 1
+    entries = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert {os.path.basename(e["path"]) for e in entries} == {"a.wav", "b.wav"}
+
+
+def test_build_silence_manifest_resumes_from_other_directory_spelling(
+    tmp_path, monkeypatch
+):
+    audio_dir = tmp_path / "corpus"
+    audio_dir.mkdir()
+    sf.write(audio_dir / "a.wav", _tone_with_gaps(), SR)
+    manifest = tmp_path / "manifest.jsonl"
+    monkeypatch.chdir(tmp_path)
+
+    build_silence_manifest("corpus", manifest, max_workers=1, verbose=False)
+    stats = build_silence_manifest(audio_dir, manifest, max_workers=1, verbose=False)
+    assert (stats["processed"], stats["skipped"]) == (0, 1)
+
+    monkeypatch.chdir(audio_dir)
+    stats = build_silence_manifest(".", manifest, max_workers=1, verbose=False)
+    assert (stats["processed"], stats["skipped"]) == (0, 1)
+
+    entries = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert [entry["path"] for entry in entries] == [str(audio_dir / "a.wav")]
+
+
+def test_build_silence_manifest_resumes_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    audio_dir = tmp_path / "corpus"
+    audio_dir.mkdir()
+    sf.write(audio_dir / "a.wav", np.full(SR, 0.5), SR)
+    manifest = tmp_path / "manifest.parquet"
+
+    stats = build_silence_manifest(audio_dir, manifest, max_workers=2, verbose=False)
+    assert stats["processed"] == 1
+
+    sf.write(audio_dir / "b.wav", _tone_with_gaps(), SR)
+    stats = build_silence_manifest(audio_dir, manifest, max_workers=2, verbose=False)
+
+    assert stats["skipped"] == 1
+    assert stats["processed"] == 1
+    assert not os.path.exists(f"{manifest}.tmp")
+    rows = {
+        os.path.basename(row["path"]): row
+        for row in pq.read_table(manifest).to_pylist()
+    }
+    assert rows["a.wav"]["silent_parts"] == []
+    assert len(rows["b.wav"]["silent_parts"]) == 3
+
+
+def test_get_total_duration_cache_only_probes_changed_files(tmp_path, monkeypatch):
+    audio_dir = tmp_path / "corpus"
+    audio_dir.mkdir()
+    for name, seconds in [("a.wav", 1.0), ("b.wav", 2.0), ("c.wav", 0.5)]:
+        sf.write(audio_dir / name, np.zeros(int(SR * seconds)), SR)
+    cache_path = tmp_path / "durations.sqlite"
+
+    probed = []
+    probe_audio = audio._probe_audio
+
+    def counting_probe(path):
+        probed.append(os.path.basename(path))
+        return probe_audio(path)
+
+    monkeypatch.setattr(audio, "_probe_audio", counting_probe)
+
+    assert get_total_duration(audio_dir, cache_path=cache_path) == pytest.approx(3.5)
+    assert sorted(probed) == ["a.wav", "b.wav", "c.wav"]
+
+    probed.clear()
+    assert get_total_duration(audio_dir, cache_path=cache_path) == pytest.approx(3.5)
+    assert probed == []
+
+    (audio_dir / "c.wav").unlink()
+    sf.write(audio_dir / "a.wav", np.zeros(SR * 4), SR)
+    os.utime(audio_dir / "a.wav", ns=(0, 0))
+    assert get_total_duration(audio_dir, cache_path=cache_path) == pytest.approx(6.0)
+    assert probed == ["a.wav"]
+
+    with sqlite3.connect(cache_path) as conn:
+        (count,) = conn.execute("SELECT COUNT(*) FROM audio_files").fetchone()
+    assert count == 2
+    assert get_total_duration(audio_dir) == pytest.approx(6.0)
+
+
+def test_get_total_duration_cache_retries_failed_probes(tmp_path, monkeypatch):
+    audio_dir = tmp_path / "corpus"
+    audio_dir.mkdir()
+    sf.write(audio_dir / "a.wav", np.zeros(SR), SR)
+    cache_path = tmp_path / "durations.sqlite"
+    probe_audio = audio._probe_audio
+
+    def failing_probe(path):
+        raise PermissionError("busy")
+
+    monkeypatch.setattr(audio, "_probe_audio", failing_probe)
+    assert get_total_duration(audio_dir, cache_path=cache_path) == 0
+    with sqlite3.connect(cache_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM audio_files").fetchone() == (0,)
+
+    monkeypatch.setattr(audio, "_probe_audio", probe_audio)
+    assert get_total_duration(audio_dir, cache_path=cache_path) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize(
+    "name, channels, subtype",
+    [
+        ("pcm16.wav", 1, "PCM_16"),
+        ("float.wav", 2, "FLOAT"),
+        ("pcm24.flac", 2, "PCM_24"),
+        ("pcm16.flac", 1, "PCM_16"),
+    ],
+)
+def test_header_probe_matches_soundfile(tmp_path, name, channels, subtype):
+    path = tmp_path / name
+    sf.write(path, np.zeros((12345, channels)), 16000, subtype=subtype)
+
+    info = sf.info(path)
+    assert audio._read_header_info(path) == (
+        info.frames,
+        info.samplerate,
+        info.channels,
+    )
+
+
+def test_header_probe_skips_extra_wav_chunks(tmp_path):
+    fmt = struct.pack("<HHIIHH", 1, 2, 8000, 8000 * 4, 4, 16)
+    data = bytes(4 * 100)
+    body = (
+        b"WAVE"
+        + b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", len(data)) + data
+    )
+    path = tmp_path / "chunks.wav"
+    path.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+    assert audio._read_header_info(path) == (100, 8000, 2)
+    assert audio.get_duration(path) == pytest.approx(100 / 8000)
+
+
+def test_header_probe_falls_back_for_other_formats(tmp_path):
+    path = tmp_path / "tone.ogg"
+    sf.write(path, np.zeros(SR), SR, format="OGG")
+    truncated = tmp_path / "truncated.wav"
+    truncated.write_bytes(b"RIFF\x00\x00\x00\x00WAVEfmt ")
+
+    assert audio._read_header_info(path) is None
+    assert audio._read_header_info(truncated) is None
+    assert audio.get_duration(path) == pytest.approx(1.0, abs=0.01)
+
+
+def test_get_duration_stats_groups_in_one_scan(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b" / "c").mkdir(parents=True)
+    sf.write(tmp_path / "a" / "one.wav", np.zeros(16000 * 3), 16000)
+    sf.write(tmp_path / "a" / "two.wav", np.zeros((SR // 2, 2)), SR)
+    sf.write(tmp_path / "b" / "c" / "three.wav", np.zeros(16000 * 12), 16000)
+    (tmp_path / "b" / "notes.txt").write_text("not audio")
+
+    stats = get_duration_stats(tmp_path, histogram_edges=(0, 1, 10))
+
+    assert stats["files"] == 3
+    assert stats["total_seconds"] == pytest.approx(15.5)
+    assert stats["by_directory"]["a"] == {"files": 2, "seconds": pytest.approx(3.5)}
+    assert stats["by_directory"][os.path.join("b", "c")]["seconds"] == 12
+    assert stats["by_samplerate"][16000]["files"] == 2
+    assert stats["by_channels"][2] == {"files": 1, "seconds": pytest.approx(0.5)}
+    assert stats["histogram"] == {"edges": [0, 1, 10], "counts": [1, 2]}
+
+
+def test_compute_spectrogram_uses_content_cache(tmp_path, wav_with_gaps, monkeypatch):
+    cache_dir = tmp_path / "cache"
+
+    spectrogram_db, sample_rate = compute_spectrogram(
+        wav_with_gaps, fft_size=512, cache_dir=cache_dir
+    )
+
+    assert sample_rate == SR
+    assert spectrogram_db.shape[0] == 257
+    assert spectrogram_db.max() == 0
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def fail_read(*args, **kwargs):
+        raise AssertionError("cached spectrograms must not decode the audio")
+
+    monkeypatch.setattr(audio.sf, "read", fail_read)
+    cached_db, cached_rate = compute_spectrogram(
+        wav_with_gaps, fft_size=512, cache_dir=cache_dir
+    )
+
+    np.testing.assert_array_equal(cached_db, spectrogram_db)
+    assert cached_rate == SR
+
+    with pytest.raises(AssertionError):
+        compute_spectrogram(wav_with_gaps, fft_size=1024, cache_dir=cache_dir)
+
+
+@pytest.mark.parametrize("block_frames", [1, 7, 10000])
+def test_compute_stft_memmap_matches_full_stft(tmp_path, wav_with_gaps, block_frames):
+    signal, _ = sf.read(wav_with_gaps)
+    expected = np.abs(
+        librosa.stft(signal, n_fft=512, hop_length=128, center=False)
+    )
+
+    magnitude, sample_rate = compute_stft_memmap(
+        wav_with_gaps,
+        tmp_path / "magnitude.npy",
+        fft_size=512,
+        block_frames=block_frames,
+    )
+
+    assert sample_rate == SR
+    assert isinstance(magnitude, np.memmap)
+    np.testing.assert_allclose(magnitude, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_compute_stft_memmap_db_matches_compute_spectrogram(tmp_path, wav_with_gaps):
+    expected, _ = compute_spectrogram(wav_with_gaps, fft_size=512)
+
+    spectrogram_db, _ = compute_stft_memmap(
+        wav_with_gaps, tmp_path / "db.npy", fft_size=512, block_frames=50, to_db=True
+    )
+
+    np.testing.assert_allclose(spectrogram_db, expected, atol=1e-3)
+
+
+def test_render_spectrograms_reports_outputs_and_failures(tmp_path):
+    audio_dir = tmp_path / "corpus"
+    (audio_dir / "sub").mkdir(parents=True)
+    sf.write(audio_dir / "a.wav", _tone_with_gaps(), SR)
+    sf.write(audio_dir / "sub" / "b.wav", _tone_with_gaps(), SR)
+    (audio_dir / "broken.wav").write_bytes(b"not audio")
+    out_dir = tmp_path / "images"
+
+    result = render_spectrograms(
+        audio_dir,
+        output_dir=out_dir,
+        fft_size=512,
+        save_params={"dpi": 50},
+        max_workers=2,
+        verbose=False,
+    )
+
+    outputs = sorted(os.path.relpath(p, out_dir) for p in result["rendered"].values())
+    assert outputs == ["a.png", os.path.join("sub", "b.png")]
+    assert (out_dir / "sub" / "b.png").read_bytes()[:4] == b"\x89PNG"
+    assert list(result["failed"]) == [str(audio_dir / "broken.wav")]
+
+
+def test_save_spectrogram_image_writes_lut_colored_png(tmp_path, wav_with_gaps):
+    import matplotlib.image
+
+    save_path = save_spectrogram_image(
+        wav_with_gaps, tmp_path / "fast.png", fft_size=512, height=64
+    )
+
+    spectrogram_db, _ = compute_spectrogram(wav_with_gaps, fft_size=512)
+    image = matplotlib.image.imread(save_path)
+    assert image.shape == (64, spectrogram_db.shape[1], 3)
+
+    level = int(np.clip((spectrogram_db[-1, 0] + 80) * 255 / 80, 0, 255))
+    np.testing.assert_array_equal(
+        np.rint(image[0, 0] * 255), spectrogram._INFERNO_LUT[level]
+    )
+
+
+def test_render_spectrograms_fast_path(tmp_path, wav_with_gaps):
+    result = render_spectrograms(
+        [wav_with_gaps],
+        output_dir=tmp_path / "fast",
+        fft_size=512,
+        fast=True,
+        max_workers=1,
+        verbose=False,
+    )
+
+    assert result["failed"] == {}
+    assert (tmp_path / "fast" / "gaps.png").read_bytes()[:4] == b"\x89PNG"
+
+
+@pytest.fixture
+def stereo_wav(tmp_path):
+    left = _tone_with_gaps()
+    right = np.roll(left, SR // 4) * 0.25
+    path = tmp_path / "stereo.wav"
+    sf.write(path, np.stack([left, right], axis=1), SR)
+    return path
+
+
+def test_compute_spectrogram_multichannel_batches_channels(stereo_wav):
+    signal, _ = sf.read(stereo_wav)
+
+    spectrogram_db, _ = compute_spectrogram(stereo_wav, fft_size=512)
+
+    assert spectrogram_db.shape[:2] == (2, 257)
+    magnitudes = [
+        np.abs(librosa.stft(channel, n_fft=512, hop_length=128, center=False))
+        for channel in signal.T
+    ]
+    expected = librosa.amplitude_to_db(np.stack(magnitudes), ref=np.max)
+    np.testing.assert_allclose(spectrogram_db, expected, atol=1e-6)
+
+
+def test_compute_spectrogram_mono_downmix(stereo_wav):
+    spectrogram_db, _ = compute_spectrogram(stereo_wav, fft_size=512, mono=True)
+
+    assert spectrogram_db.shape[0] == 257
+    assert spectrogram_db.ndim == 2
+
+
+def test_save_spectrogram_image_stacks_channels(tmp_path, stereo_wav):
+    import matplotlib.image
+
+    save_path = save_spectrogram_image(
+        stereo_wav, tmp_path / "stereo.png", fft_size=512, height=32
+    )
+
+    assert matplotlib.image.imread(save_path).shape[0] == 64
+
+
+# Budget for ``import toolify.audio`` in a fresh interpreter, in seconds.
+IMPORT_BUDGET_SEC = 1.0
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import toolify.audio
+elapsed = time.perf_counter() - start
+toolify.audio.get_total_duration(sys.argv[1])
+heavy = [m for m in ("librosa", "matplotlib", "tqdm") if m in sys.modules]
+print(json.dumps({"elapsed": elapsed, "heavy": heavy}))
+"""
+
+
+def test_import_audio_is_lazy_and_fast(tmp_path):
+    sf.write(tmp_path / "a.wav", np.zeros(SR), SR)
+
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE, str(tmp_path)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    probe = json.loads(result.stdout)
+
+    assert probe["heavy"] == []
+    assert probe["elapsed"] < IMPORT_BUDGET_SEC
+
+
+@pytest.mark.parametrize("frame_length", [None, 1024])
+def test_sweep_silence_matches_individual_calls(wav_with_gaps, frame_length):
+    thresholds = (-60, -40, -3)
+    margins = (0.0, 0.15)
+
+    results = sweep_silence(
+        wav_with_gaps, thresholds, margins, frame_length=frame_length
+    )
+
+    assert [(r["threshold_db"], r["margin_sec"]) for r in results] == [
+        (t, m) for t in thresholds for m in margins
+    ]
+    for result in results:
+        expected, _, _ = get_silent_parts(
+            wav_with_gaps,
+            result["threshold_db"],
+            result["margin_sec"],
+            frame_length=frame_length,
+        )
+        assert result["silent_parts"].tolist() == expected.tolist()
+        assert result["count"] == len(expected)
+        assert result["total_silence_sec"] == pytest.approx(expected["duration"].sum())
+
+
+def test_level_envelope_sidecar_is_reused_until_file_changes(
+    tmp_path, wav_with_gaps, monkeypatch
+):
+    cache_dir = tmp_path / "envelopes"
+    envelope, sr, hop, n_samples = get_level_envelope(
+        wav_with_gaps, frame_rate=100, cache_dir=cache_dir
+    )
+
+    assert envelope.dtype == np.float16
+    assert (sr, hop) == (SR, 220)
+    assert len(envelope) == -(-n_samples // hop)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def fail_blocks(*args, **kwargs):
+        raise AssertionError("envelope should come from the cache")
+
+    def fail_info(*args, **kwargs):
+        raise AssertionError("cache hits should not open the audio")
+
+    monkeypatch.setattr(audio.sf, "blocks", fail_blocks)
+    with monkeypatch.context() as m:
+        m.setattr(audio.sf, "info", fail_info)
+        cached, cached_sr, cached_hop, cached_n = get_level_envelope(
+            wav_with_gaps, frame_rate=100, cache_dir=cache_dir
+        )
+    assert np.array_equal(cached, envelope)
+    assert (cached_sr, cached_hop, cached_n) == (sr, hop, n_samples)
+    with pytest.raises(AssertionError, match="from the cache"):
+        get_level_envelope(wav_with_gaps, frame_rate=50, cache_dir=cache_dir)
+
+    sf.write(wav_with_gaps, _tone_with_gaps()[: SR // 2], SR)
+    with pytest.raises(AssertionError, match="from the cache"):
+        get_level_envelope(wav_with_gaps, frame_rate=100, cache_dir=cache_dir)
+
+
+def test_envelope_silent_parts_match_per_sample_detection(wav_with_gaps):
+    expected, _, _ = get_silent_parts(wav_with_gaps, sr=None)
+    parts, sr = get_envelope_silent_parts(wav_with_gaps, frame_rate=100)
+
+    assert os.path.exists(f"{wav_with_gaps}.envelope.npz")
+    assert sr == SR
+    assert len(parts) == len(expected)
+    assert np.allclose(parts["start_sec"], expected["start_sec"], atol=0.01)
+    assert np.allclose(parts["end_sec"], expected["end_sec"], atol=0.01)
+    assert parts[-1]["end_idx"] == expected[-1]["end_idx"]
+
+
+def test_split_on_silence_writes_segments_and_manifest(tmp_path):
+    y = np.concatenate([np.zeros(SR // 2, dtype=np.float32), _tone_with_gaps()])
+    stereo = np.stack([y, y * 0.5], axis=1)
+    path = tmp_path / "talk.wav"
+    sf.write(path, stereo, SR, subtype="PCM_24")
+    out_dir = tmp_path / "segments"
+
+    segments = split_on_silence(path, out_dir, max_workers=2, block_size=1000)
+
+    # Leading and trailing silence are dropped, the two gaps split the sound.
+    assert [s["index"] for s in segments] == [0, 1, 2]
+    margin = int(SR * 0.15)
+    assert segments[0]["start_idx"] == SR // 2 - margin
+    audio_data, _ = sf.read(path, always_2d=True)
+    for segment in segments:
+        data, sr = sf.read(segment["path"], always_2d=True)
+        assert sr == SR
+        assert sf.info(segment["path"]).subtype == "PCM_24"
+        assert np.array_equal(
+            data, audio_data[segment["start_idx"] : segment["end_idx"]]
+        )
+
+    with open(out_dir / "talk_segments.jsonl", encoding="utf-8") as f:
+        manifest = [json.loads(line) for line in f]
+    assert manifest == segments
+
+
+def test_split_on_silence_skips_short_segments(tmp_path, wav_with_gaps):
+    segments = split_on_silence(
+        wav_with_gaps, tmp_path / "out", min_segment_sec=0.62, max_workers=1
+    )
+
+    assert len(segments) == 1
+    assert segments[0]["duration"] == pytest.approx(0.5 + 0.15, abs=1e-3)
+    assert sorted(os.listdir(tmp_path / "out")) == [
+        "gaps_0000.wav",
+        "gaps_segments.jsonl",
+    ]
+
+
+@pytest.mark.parametrize("frame_length, hop_length", [(None, None), (1024, 300)])
+@pytest.mark.parametrize("threshold", [-40, -200])
+def test_get_silent_parts_parallel_matches_sequential(
+    stereo_wav, frame_length, hop_length, threshold
+):
+    expected, _, _ = get_silent_parts(
+        stereo_wav,
+        threshold,
+        sr=None,
+        frame_length=frame_length,
+        hop_length=hop_length,
+    )
+
+    # Ranges of 0.13 s put boundaries inside both sound and silence.
+    parts, sr = get_silent_parts_parallel(
+        stereo_wav,
+        threshold,
+        frame_length=frame_length,
+        hop_length=hop_length,
+        chunk_sec=0.13,
+        max_workers=2,
+    )
+
+    assert sr == SR
+    assert parts.tolist() == expected.tolist()
+
+
+def test_transcode_directory_resamples_and_skips_up_to_date(tmp_path):
+    src = tmp_path / "raw"
+    (src / "sub").mkdir(parents=True)
+    y = _tone_with_gaps(44100)
+    sf.write(src / "a.wav", np.stack([y, y], axis=1), 44100)
+    sf.write(src / "sub" / "b.wav", y[:22050], 22050)
+    (src / "broken.wav").write_bytes(b"not audio")
+    out = tmp_path / "16k"
+
+    stats = transcode_directory(src, out, block_size=1000, verbose=False)
+
+    assert (stats["processed"], stats["skipped"], stats["failed"]) == (2, 0, 1)
+    assert str(src / "broken.wav") in stats["errors"]
+    assert stats["audio_hours"] == pytest.approx((len(y) / 44100 + 1) / 3600)
+    assert not [p for p in out.rglob("*") if ".tmp" in p.name]
+
+    data, sr = sf.read(out / "a.flac")
+    expected = librosa.load(src / "a.wav", sr=16000)[0]
+    assert sr == 16000
+    assert data.shape == expected.shape
+    assert np.abs(data - expected).max() < 1e-4
+    assert sf.info(out / "sub" / "b.flac").samplerate == 16000
+
+    stats = transcode_directory(src, out, verbose=False)
+    assert (stats["processed"], stats["skipped"], stats["failed"]) == (0, 2, 1)
+
+    # Outputs made for another target are converted again.
+    stats = transcode_directory(src, out, sample_rate=8000, verbose=False)
+    assert (stats["processed"], stats["skipped"]) == (2, 0)
+    assert sf.info(out / "a.flac").samplerate == 8000
+    stats = transcode_directory(
+        src, out, sample_rate=8000, channels=None, verbose=False
+    )
+    assert (stats["processed"], stats["skipped"]) == (1, 1)
+    assert sf.info(out / "a.flac").channels == 2
+    stats = transcode_directory(
+        src, out, sample_rate=8000, channels=None, subtype="PCM_24", verbose=False
+    )
+    assert (stats["processed"], stats["skipped"]) == (2, 0)
+    stats = transcode_directory(
+        src, out, sample_rate=8000, channels=None, subtype="PCM_24", verbose=False
+    )
+    assert (stats["processed"], stats["skipped"]) == (0, 2)
+
+
+def test_transcode_directory_refuses_to_overwrite_inputs(tmp_path):
+    with pytest.raises(ValueError, match="overwrite"):
+        transcode_directory(tmp_path, tmp_path, output_ext=".wav", verbose=False)
+
+
+@pytest.mark.parametrize("feature, n_features", [("log_mel", 40), ("linear", 257)])
+def test_feature_store_returns_memmap_views(tmp_path, feature, n_features):
+    src = tmp_path / "audio"
+    (src / "spk").mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for i in range(5):
+        y = rng.normal(0, 0.1, 8000 + i * 1600).astype(np.float32)
+        sf.write(src / "spk" / f"u{i}.wav", y, 16000)
+
+    stats = build_feature_store(
+        src,
+        tmp_path / "store",
+        feature=feature,
+        n_mels=40,
+        shard_size_mb=0.03,
+        max_workers=2,
+        verbose=False,
+    )
+    store = FeatureStore(tmp_path / "store")
+
+    assert stats["processed"] == len(store) == 5
+    assert stats["shards"] > 1
+    assert sorted(store) == [os.path.join("spk", f"u{i}.wav") for i in range(5)]
+
+    features = store[os.path.join("spk", "u3.wav")]
+    assert isinstance(features, np.memmap)
+    assert features.dtype == np.float32
+    assert features.shape == (1 + (8000 + 3 * 1600) // 160, n_features)
+    expected = audio_features._extract_features(
+        str(src / "spk" / "u3.wav"), store.params
+    )
+    assert np.array_equal(features, expected)
+    assert stats["frames"] == sum(len(store[key]) for key in store)
+
+
+def test_feature_store_survives_interrupted_rebuild(tmp_path, monkeypatch):
+    src = tmp_path / "audio"
+    src.mkdir()
+    rng = np.random.default_rng(1)
+    for i in range(4):
+        sf.write(src / f"u{i}.wav", rng.normal(0, 0.1, 8000).astype(np.float32), 16000)
+    store_dir = tmp_path / "store"
+    kwargs = dict(n_mels=40, shard_size_mb=0.01, max_workers=2, verbose=False)
+    build_feature_store(src, store_dir, **kwargs)
+    before = {key: np.array(value) for key, value in FeatureStore(store_dir).items()}
+
+    save_npy = audio_features._save_npy
+    calls = []
+
+    def failing_save(path, array):
+        calls.append(path)
+        if len(calls) > 1:
+            raise OSError("disk full")
+        save_npy(path, array)
+
+    monkeypatch.setattr(audio_features, "_save_npy", failing_save)
+    with pytest.raises(OSError):
+        build_feature_store(src, store_dir, feature="linear", **kwargs)
+
+    store = FeatureStore(store_dir)
+    assert store.params["feature"] == "log_mel"
+    assert all(np.array_equal(store[key], before[key]) for key in before)
+
+    monkeypatch.setattr(audio_features, "_save_npy", save_npy)
+    reader = FeatureStore(store_dir)
+    old_shards = set(reader._shard_names)
+    stats = build_feature_store(src, store_dir, **kwargs)
+
+    # A reader opened before the rebuild maps its shards lazily and still
+    # serves the previous build.
+    assert not reader._shards
+    assert all(np.array_equal(reader[key], before[key]) for key in before)
+    shards = {name for name in os.listdir(store_dir) if name.endswith(".npy")}
+    new_shards = set(FeatureStore(store_dir)._shard_names)
+    assert len(new_shards) == stats["shards"]
+    assert shards == old_shards | new_shards
+
+    # Older generations, and the shard of the failed build, are removed.
+    build_feature_store(src, store_dir, **kwargs)
+    shards = {name for name in os.listdir(store_dir) if name.endswith(".npy")}
+    assert shards == new_shards | set(FeatureStore(store_dir)._shard_names)
+
+
+def test_spectrogram_pyramid_levels_and_cache(tmp_path, wav_with_gaps, monkeypatch):
+    out = tmp_path / "tiles"
+    pyramid = build_spectrogram_pyramid(
+        wav_with_gaps,
+        out,
+        fft_size=512,
+        tile_width=32,
+        height=40,
+        block_frames=50,
+        max_workers=2,
+    )
+
+    n_frames = 1 + (len(_tone_with_gaps()) - 512) // 128
+    assert pyramid["n_frames"] == n_frames
+    levels = pyramid["levels"]
+    assert levels[0]["tiles"] == 1
+    assert levels[-1]["frames_per_pixel"] == 1
+    assert levels[-1]["width"] == n_frames
+    for level in levels:
+        tiles = sorted(os.listdir(out / str(level["level"])))
+        assert len(tiles) == level["tiles"]
+        assert level["width"] == -(-n_frames // level["frames_per_pixel"])
+
+    # The finest level matches the whole-file image column for column.
+    import matplotlib.image
+
+    image = tmp_path / "full.png"
+    save_spectrogram_image(wav_with_gaps, image, fft_size=512, height=40)
+    full = matplotlib.image.imread(image)
+    finest = np.concatenate(
+        [
+            matplotlib.image.imread(out / str(levels[-1]["level"]) / f"{c}.png")
+            for c in range(levels[-1]["tiles"])
+        ],
+        axis=1,
+    )
+    assert finest.shape == (40, n_frames, 3)
+    np.testing.assert_allclose(finest, full, atol=0.02)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("pyramid should be reused")
+
+    monkeypatch.setattr(spectrogram, "_pyramid_finest_level", fail)
+    assert build_spectrogram_pyramid(
+        wav_with_gaps, out, fft_size=512, tile_width=32, height=40
+    ) == pyramid
+
+    with pytest.raises(AssertionError, match="reused"):
+        build_spectrogram_pyramid(
+            wav_with_gaps, out, fft_size=512, tile_width=64, height=40
+        )
+
+    monkeypatch.undo()
+    rebuilt = build_spectrogram_pyramid(
+        wav_with_gaps, out, fft_size=512, tile_width=128, height=40
+    )
+    assert len(rebuilt["levels"]) < len(levels)
+    assert sorted(os.listdir(out)) == sorted(
+        [str(level["level"]) for level in rebuilt["levels"]] + ["pyramid.json"]
+    )
+    for level in rebuilt["levels"]:
+        assert len(os.listdir(out / str(level["level"]))) == level["tiles"]
+
+
+def _melody(seed, sr=SR, notes=24):
+    """Return a sequence of random harmonic notes, a quarter second each."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(sr // 4) / sr
+    pieces = []
+    for _ in range(notes):
+        f = rng.uniform(150, 1500)
+        note = sum(np.sin(2 * np.pi * f * h * t) / h for h in (1, 2, 3))
+        pieces.append(note * np.hanning(len(t)))
+    return (0.3 * np.concatenate(pieces)).astype(np.float32)
+
+
+def test_fingerprint_index_finds_near_duplicates(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    original = _melody(1)
+    sf.write(corpus / "original.wav", original, SR)
+    copy = librosa.resample(original * 0.5, orig_sr=SR, target_sr=16000)
+    copy += np.random.default_rng(0).normal(0, 0.01, len(copy)).astype(np.float32)
+    sf.write(corpus / "reencoded.wav", copy, 16000, subtype="PCM_16")
+    sf.write(corpus / "excerpt.wav", original[SR : 4 * SR], SR)
+    for seed in range(2, 5):
+        sf.write(corpus / f"other_{seed}.wav", _melody(seed), SR)
+    index = tmp_path / "fingerprints.sqlite"
+
+    stats = build_fingerprint_index(corpus, index, max_workers=2, verbose=False)
+    assert (stats["processed"], stats["skipped"]) == (6, 0)
+
+    duplicates = find_duplicates(index, corpus / "original.wav")
+    assert sorted(os.path.basename(d["path"]) for d in duplicates) == [
+        "excerpt.wav",
+        "reencoded.wav",
+    ]
+    excerpt = next(d for d in duplicates if d["path"].endswith("excerpt.wav"))
+    assert excerpt["offset_sec"] == pytest.approx(-1.0, abs=0.05)
+
+    # Files outside the index can be looked up as well.
+    outside = tmp_path / "query.wav"
+    sf.write(outside, original[2 * SR :], SR)
+    assert "original.wav" in [
+        os.path.basename(d["path"]) for d in find_duplicates(index, outside)
+    ]
+
+    (corpus / "other_2.wav").unlink()
+    os.utime(corpus / "excerpt.wav", ns=(1, 1))
+    stats = build_fingerprint_index(corpus, index, max_workers=1, verbose=False)
+    assert (stats["processed"], stats["skipped"], stats["removed"]) == (1, 4, 1)
+    with sqlite3.connect(index) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM files").fetchone() == (5,)
+
+    # Lookups never create or change an index.
+    missing = tmp_path / "missing.sqlite"
+    with pytest.raises(FileNotFoundError):
+        find_duplicates(missing, corpus / "original.wav")
+    assert not missing.exists()
+
+    # Indexes with another hash layout are refused by lookups and
+    # fingerprinted again by the next build.
+    with sqlite3.connect(index) as conn:
+        conn.execute("PRAGMA user_version = 1")
+    with pytest.raises(ValueError, match="Rebuild"):
+        find_duplicates(index, corpus / "original.wav")
+    with sqlite3.connect(index) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM files").fetchone() == (5,)
+    stats = build_fingerprint_index(corpus, index, max_workers=1, verbose=False)
+    assert (stats["processed"], stats["skipped"]) == (5, 0)
+
+
+def test_fingerprint_hash_fields_do_not_overlap(tmp_path):
+    # A tone at Nyquist gives peaks in the top frequency bin.
+    t = np.arange(3 * fingerprint._FP_SAMPLE_RATE) / fingerprint._FP_SAMPLE_RATE
+    y = np.sin(2 * np.pi * (200 + 650 * t) * t)
+    y[len(y) // 2 :] += np.cos(np.pi * np.arange(len(y) - len(y) // 2))
+    path = tmp_path / "chirp.wav"
+    sf.write(path, y * 0.4, fingerprint._FP_SAMPLE_RATE)
+
+    hashes, _ = fingerprint._fingerprint(str(path))
+    n_bins = fingerprint._FP_FFT_SIZE // 2 + 1
+    first, second, dt = hashes >> 16, (hashes >> 6) & 1023, hashes & 63
+
+    assert (second == n_bins - 1).any()
+    assert first.max() < n_bins and second.max() < n_bins
+    assert ((first << 16) | (second << 6) | dt).tolist() == hashes.tolist()
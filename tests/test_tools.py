@@ -1,12 +1,21 @@
+import io
 import os
 import logging
 import pytest
 from datetime import datetime
 
 from toolify.tools import (
+    Style,
+    buffered_output,
+    pat,
+    pat_many,
     pct,
+    print_columns,
     print_table,
+    stream_table,
     setup_logger,
+    shape_arabic,
+    shape_cache_info,
     strip_tashkeel,
     confirm,
 )
@@ -57,6 +66,117 @@ def test_pct_custom_end(capsys):
     assert captured.out == "Hello"
 
 
+def test_pct_drops_colors_when_not_a_tty(capsys, monkeypatch):
+    monkeypatch.delenv("FORCE_COLOR", raising=False)
+    monkeypatch.delenv("NO_COLOR", raising=False)
+
+    pct("Done", color="green", emoji="success")
+
+    assert capsys.readouterr().out == "✅ Done\n"
+
+
+def test_style_matches_pct_with_forced_colors(capsys, monkeypatch):
+    monkeypatch.setenv("FORCE_COLOR", "1")
+    monkeypatch.delenv("NO_COLOR", raising=False)
+    style = Style(color="green", bcolor="yellow", emoji="success", end_emoji="fire")
+
+    pct("Done", color="green", bcolor="yellow", emoji="success", end_emoji="fire")
+    style("Done")
+
+    first, second = capsys.readouterr().out.splitlines()
+    assert first == second == style.format("Done")
+    assert first.startswith("✅ \033[")
+    assert first.endswith("Done\033[0m 🔥")
+    assert style.format("Done", ec=False) == "✅ Done 🔥"
+
+
+def test_buffered_output_writes_in_chunks(monkeypatch):
+    monkeypatch.delenv("FORCE_COLOR", raising=False)
+
+    class Recorder(io.StringIO):
+        writes = 0
+
+        def write(self, text):
+            self.writes += 1
+            return super().write(text)
+
+    out = Recorder()
+    with buffered_output(file=out, chunk_size=100):
+        for i in range(50):
+            pct(f"line {i}", color="red")
+        assert out.writes < 50
+
+    assert out.getvalue() == "".join(f"line {i}\n" for i in range(50))
+    assert 1 < out.writes < 10
+
+
+def test_nested_buffered_output_keeps_order(capsys):
+    with buffered_output():
+        pct("a", ec=False)
+        with buffered_output():
+            pct("b", ec=False)
+        pct("c", ec=False)
+
+    assert capsys.readouterr().out == "a\nb\nc\n"
+
+
+def test_shape_arabic_matches_reshaper_and_bidi():
+    arabic_reshaper = pytest.importorskip("arabic_reshaper")
+    get_display = pytest.importorskip("bidi.algorithm").get_display
+    reshaper = arabic_reshaper.ArabicReshaper(
+        configuration={
+            "delete_harakat": False,
+            "shift_harakat_position": False,
+            "use_unshaped_instead_of_isolated": True,
+        }
+    )
+    texts = ["مرحبا بالعالم", "مُحَمَّدٌ", "العدد 42"]
+
+    expected = [get_display(reshaper.reshape(text)) for text in texts]
+
+    assert shape_arabic(texts) == expected
+    assert shape_arabic(texts[0]) == expected[0]
+
+
+def test_pat_uses_shape_cache(capsys):
+    pytest.importorskip("arabic_reshaper")
+    pytest.importorskip("bidi.algorithm")
+    text = "تم الانتهاء من المعالجة"
+
+    pat(text, ec=False)
+    before = shape_cache_info()
+    pat(text, ec=False)
+    after = shape_cache_info()
+
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+    assert 0 < after["hit_rate"] <= 1
+    out = capsys.readouterr().out
+    assert out == 2 * (shape_arabic(text) + "\n")
+
+
+def test_pat_many_matches_pat(capsys):
+    pytest.importorskip("arabic_reshaper")
+    pytest.importorskip("bidi.algorithm")
+    texts = ["سطر أول", "سطر ثان", "سطر أول"]
+
+    for text in texts:
+        pat(text, ec=False, emoji="success")
+    expected = capsys.readouterr().out
+    pat_many(texts, ec=False, emoji="success")
+
+    assert capsys.readouterr().out == expected
+
+
+def test_pat_many_prints_a_string_as_one_line(capsys):
+    pytest.importorskip("arabic_reshaper")
+    pytest.importorskip("bidi.algorithm")
+
+    pat_many("سلام", ec=False)
+
+    assert capsys.readouterr().out == shape_arabic("سلام") + "\n"
+
+
 def test_print_table_outputs_headers_and_rows(capsys):
     headers = ["Name", "Score"]
     rows = [
@@ -74,6 +194,111 @@ def test_print_table_outputs_headers_and_rows(capsys):
     assert "Sara" in captured.out
 
 
+def test_print_table_writes_expected_layout(capsys):
+    print_table(["Name", "Score"], [["Ali", 95], ["Sara"]], style=6, separator=True)
+
+    captured = capsys.readouterr()
+
+    assert captured.out == (
+        "+------+-------+\n"
+        "| Name | Score |\n"
+        "+------+-------+\n"
+        "| Ali  | 95    |\n"
+        "+------+-------+\n"
+        "| Sara |       |\n"
+        "+------+-------+\n"
+    )
+
+
+def test_stream_table_matches_print_table(capsys):
+    headers = ["Name", "Score"]
+    rows = [["Ali", 95], ["Sara", 88], ["Mohamed"]]
+
+    print_table(headers, rows, style=2, separator=True)
+    expected = capsys.readouterr().out
+
+    buffer = io.StringIO()
+    count = stream_table(
+        headers, iter(rows), style=2, separator=True, file=buffer, chunk_rows=1
+    )
+
+    assert count == 3
+    assert buffer.getvalue() == expected
+
+
+def test_stream_table_uses_sample_and_fixed_widths():
+    rows = (["x" * i] for i in range(1, 6))
+    buffer = io.StringIO()
+
+    stream_table(["Col"], rows, style=6, sample_size=2, file=buffer)
+
+    lines = buffer.getvalue().splitlines()
+    assert lines[3] == "| x   |"
+    assert lines[-2] == "| xx… |"
+
+    buffer = io.StringIO()
+    stream_table(["Column"], [["abcdef"]], style=6, widths=[4], file=buffer)
+
+    assert buffer.getvalue().splitlines()[1] == "| Col… |"
+    assert buffer.getvalue().splitlines()[3] == "| abc… |"
+
+
+def test_stream_table_empty_rows():
+    buffer = io.StringIO()
+
+    assert stream_table(["A"], iter([]), file=buffer) == 0
+    assert buffer.getvalue() == "Empty data\n"
+
+
+@pytest.mark.parametrize("style", [1, 6, 7])
+@pytest.mark.parametrize("separator", [None, True])
+def test_print_columns_matches_print_table(capsys, style, separator):
+    np = pytest.importorskip("numpy")
+    columns = {
+        "id": np.arange(4),
+        "score": np.array([0.5, 12.25, 3.0, 100.0]),
+        "name": np.array(["Ali", "Sara", "", "Mohamed"]),
+    }
+
+    print_table(
+        list(columns),
+        list(zip(*[column.tolist() for column in columns.values()])),
+        style=style,
+        separator=separator,
+    )
+    expected = capsys.readouterr().out
+
+    buffer = io.StringIO()
+    print_columns(columns, style=style, separator=separator, file=buffer)
+
+    assert buffer.getvalue() == expected
+
+
+def test_print_columns_accepts_arrays_and_arrow(capsys):
+    np = pytest.importorskip("numpy")
+
+    print_columns(np.array([[1, 2], [3, 4]]), headers=["a", "b"], style=6)
+    from_array = capsys.readouterr().out
+    assert from_array.splitlines()[3] == "| 1 | 2 |"
+
+    pa = pytest.importorskip("pyarrow")
+    print_columns(pa.table({"a": [1, 3], "b": [2, 4]}), style=6)
+    assert capsys.readouterr().out == from_array
+
+
+def test_print_columns_accepts_dataframes(capsys):
+    pd = pytest.importorskip("pandas")
+
+    print_columns(pd.DataFrame({"a": [1, 3], "b": ["x", "y"]}), style=6)
+
+    assert capsys.readouterr().out.splitlines()[3] == "| 1 | x |"
+
+
+def test_print_columns_rejects_ragged_columns():
+    with pytest.raises(ValueError, match="different lengths"):
+        print_columns({"a": [1, 2], "b": [1]})
+
+
 def test_setup_logger_creates_log_file(tmp_path):
     date_str = datetime.now().strftime("%Y_%m_%d")
     log_file = tmp_path /f"test.log"
@@ -1,15 +1,51 @@
 """Audio utility functions for the toolify package."""
 
 from .audio import (
+    compute_spectrogram,
+    compute_stft_memmap,
     get_duration,
+    get_duration_stats,
+    get_envelope_silent_parts,
+    get_level_envelope,
     get_silent_parts,
+    get_silent_parts_parallel,
     get_spectrogram,
     get_total_duration,
+    iter_silent_parts,
+    sweep_silence,
 )
+from .features import FeatureStore, build_feature_store
+from .fingerprint import build_fingerprint_index, find_duplicates
+from .manifest import build_silence_manifest
+from .spectrogram import (
+    build_spectrogram_pyramid,
+    render_spectrograms,
+    save_spectrogram_image,
+)
+from .split import split_on_silence
+from .transcode import transcode_directory
 
 __all__ = [
     "get_silent_parts",
+    "iter_silent_parts",
+    "sweep_silence",
+    "get_silent_parts_parallel",
+    "get_level_envelope",
+    "get_envelope_silent_parts",
     "get_spectrogram",
+    "compute_spectrogram",
+    "compute_stft_memmap",
     "get_duration",
     "get_total_duration",
+    "get_duration_stats",
+    "transcode_directory",
+    "build_fingerprint_index",
+    "find_duplicates",
+    "build_silence_manifest",
+    "split_on_silence",
+    "render_spectrograms",
+    "save_spectrogram_image",
+    "build_spectrogram_pyramid",
+    "build_feature_store",
+    "FeatureStore",
 ]
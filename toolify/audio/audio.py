@@ -1,95 +1,804 @@
 """Helpers for dealing with audio files."""
 
+import hashlib
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import sqlite3
+import struct
+import tempfile
+from bisect import bisect_right
+from itertools import islice
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
 import numpy as np
 import soundfile as sf
-from tqdm import tqdm
 
 __all__ = [
     "get_silent_parts",
+    "iter_silent_parts",
+    "sweep_silence",
+    "get_silent_parts_parallel",
+    "get_level_envelope",
+    "get_envelope_silent_parts",
     "get_spectrogram",
+    "compute_spectrogram",
+    "compute_stft_memmap",
     "get_duration",
     "get_total_duration",
+    "get_duration_stats",
 ]
 
 
+# One record per silent region, see ``get_silent_parts``.
+_SILENT_PART_DTYPE = np.dtype(
+    [
+        ("start_idx", np.int64),
+        ("end_idx", np.int64),
+        ("start_sec", np.float64),
+        ("end_sec", np.float64),
+        ("duration", np.float64),
+    ]
+)
+
+# end_inc is added to avoid trimming the pause at the end of the sentence
+_END_MARGIN_INC = 1.25
+
+
+def _find_silent_runs(non_silent):
+    """Return ``(starts, ends)`` of the silent runs in a boolean mask.
+
+    ``ends`` is exclusive. A run that reaches the end of the mask gets
+    ``len(non_silent)`` as its end.
+    """
+    silent = np.concatenate(([False], ~np.asarray(non_silent, dtype=bool), [False]))
+    edges = np.diff(silent.view(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends
+
+
+def _build_silent_parts(starts, ends, total, sr, silence_margin_sec):
+    """Apply the silence margins to raw runs and pack them into records.
+
+    Regions closed by a non-silent sample are shrunk by the margin on both
+    sides. A region that runs to ``total`` (the end of the audio) only has
+    its start moved, by a slightly larger margin. Pass ``total=None`` while
+    the end of the audio has not been reached yet.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    margin_samples = int(sr * silence_margin_sec)
+
+    parts = np.empty(len(starts), dtype=_SILENT_PART_DTYPE)
+    if not len(starts):
+        return parts
+
+    tail = ends[-1] == total
+    closed = slice(0, len(starts) - 1 if tail else len(starts))
+
+    parts["start_idx"][closed] = starts[closed] + margin_samples
+    parts["end_idx"][closed] = ends[closed] - margin_samples
+
+    if tail:
+        parts["start_idx"][-1] = starts[-1] + int(margin_samples * _END_MARGIN_INC)
+        parts["end_idx"][-1] = total
+
+    parts["start_sec"] = parts["start_idx"] / sr
+    parts["end_sec"] = parts["end_idx"] / sr
+    parts["duration"] = parts["end_sec"] - parts["start_sec"]
+    parts["duration"][closed] += silence_margin_sec * 2
+    if tail:
+        parts["duration"][-1] += silence_margin_sec * _END_MARGIN_INC
+    return parts
+
+
+def _level_envelope(y, frame_length=None, hop_length=None):
+    """Return ``(db, hop_length)`` levels used for silence detection.
+
+    Without ``frame_length`` there is one level per sample and a hop of 1.
+    Otherwise levels are windowed RMS values, one per centred frame.
+    """
+    import librosa
+
+    if not frame_length:
+        return librosa.amplitude_to_db(np.abs(y)), 1
+
+    if not hop_length:
+        hop_length = frame_length // 4
+    rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)
+    return librosa.amplitude_to_db(rms[0]), hop_length
+
+
+def _envelope_silent_runs(db, silence_threshold_db, hop_length, n_samples):
+    """Find silent runs in a level envelope.
+
+    Returns ``(starts, ends, total)`` in samples, ready for
+    ``_build_silent_parts``. ``total`` is ``None`` when the audio does not
+    end with silence.
+    """
+    starts, ends = _find_silent_runs(db > silence_threshold_db)
+    return _frame_runs_to_samples(starts, ends, len(db), hop_length, n_samples)
+
+
+def _frame_runs_to_samples(starts, ends, n_frames, hop_length, n_samples):
+    """Convert silent runs of envelope frames to ``(starts, ends, total)``."""
+    if hop_length == 1:
+        return starts, ends, n_samples
+
+    starts = starts * hop_length
+    ends = ends * hop_length
+
+    # Frames are centred, so the last frame can reach past the last sample.
+    total = None
+    if len(ends) and ends[-1] == n_frames * hop_length:
+        total = n_samples
+        ends[-1] = total
+    return starts, ends, total
+
+
 def get_silent_parts(
-    input_file_path, silence_threshold_db=-40, silence_margin_sec=0.15
+    input_file_path,
+    silence_threshold_db=-40,
+    silence_margin_sec=0.15,
+    return_waveform=True,
+    sr=22050,
+    frame_length=None,
+    hop_length=None,
 ):
     """Find silent regions in an audio file.
 
+    By default every sample is compared with the threshold. Set
+    ``frame_length`` to compare windowed RMS levels instead, which is much
+    cheaper on long files and ignores the zero crossings of quiet sounds.
+
     Args:
         input_file_path: Path to the audio file.
         silence_threshold_db: Samples at or below this level are considered silent.
         silence_margin_sec: Margin applied to detected silence boundaries.
+        return_waveform: If False, ``None`` is returned instead of the
+            waveform so it can be freed as soon as detection is done.
+        sr: Sample rate the audio is resampled to. Use ``None`` to keep the
+            native rate and skip resampling.
+        frame_length: RMS window length in samples. If not set, levels are
+            computed per sample.
+        hop_length: Samples between RMS frames. Defaults to one quarter of
+            ``frame_length``.
 
     Returns:
-        A tuple of ``(silent_parts, waveform, sample_rate)``. Each silent part
-        contains sample indices, times in seconds, and duration.
+        A tuple of ``(silent_parts, waveform, sample_rate)``. ``silent_parts``
+        is a NumPy structured array with one record per region and the fields
+        ``start_idx``, ``end_idx``, ``start_sec``, ``end_sec`` and
+        ``duration``. Records can be indexed by field name, for example
+        ``part["start_sec"]``. Indices refer to samples at ``sample_rate``.
     """
-    y, sr = librosa.load(input_file_path)
+    import librosa
 
-    db = librosa.amplitude_to_db(np.abs(y))
-    margin_samples = int(sr * silence_margin_sec)
+    y, sr = librosa.load(input_file_path, sr=sr)
+
+    db, hop_length = _level_envelope(y, frame_length, hop_length)
+    starts, ends, total = _envelope_silent_runs(
+        db, silence_threshold_db, hop_length, len(y)
+    )
+
+    silent_parts = _build_silent_parts(starts, ends, total, sr, silence_margin_sec)
+    return silent_parts, y if return_waveform else None, sr
+
+
+def sweep_silence(
+    input_file_path,
+    thresholds_db=(-50, -45, -40, -35, -30),
+    margins_sec=(0.05, 0.1, 0.15, 0.2),
+    sr=22050,
+    frame_length=None,
+    hop_length=None,
+):
+    """Run silence detection for a grid of thresholds and margins.
+
+    The file is decoded and its level envelope computed once. Each threshold
+    then needs a single pass over the envelope, and every margin is applied
+    to the resulting runs with array operations. Each setting gives the same
+    regions as the matching ``get_silent_parts`` call.
 
-    non_silent = db > silence_threshold_db
+    Args:
+        input_file_path: Path to the audio file.
+        thresholds_db: Silence thresholds to try, in dB.
+        margins_sec: Silence margins to try, in seconds.
+        sr: Sample rate the audio is resampled to. Use ``None`` to keep the
+            native rate and skip resampling.
+        frame_length: RMS window length in samples, see ``get_silent_parts``.
+        hop_length: Samples between RMS frames, see ``get_silent_parts``.
 
-    silent_parts = []
-    is_silent = False
-    start_idx = 0
+    Returns:
+        A list with one dictionary per ``(threshold, margin)`` pair, holding
+        ``threshold_db``, ``margin_sec``, the ``silent_parts`` records, the
+        region ``count`` and ``total_silence_sec``, the sum of the region
+        durations.
+    """
+    import librosa
 
-    for i in tqdm(range(len(non_silent))):
-        if non_silent[i] and is_silent:
-            end_idx = i
-            start_idx += margin_samples
-            end_idx -= margin_samples
+    y, sr = librosa.load(input_file_path, sr=sr)
+    n_samples = len(y)
+    db, hop_length = _level_envelope(y, frame_length, hop_length)
+    del y
 
-            start_time = start_idx / sr
-            end_time = end_idx / sr
-            duration = end_time - start_time
-            duration += silence_margin_sec * 2
-            silent_parts.append(
+    results = []
+    for threshold_db in thresholds_db:
+        starts, ends, total = _envelope_silent_runs(
+            db, threshold_db, hop_length, n_samples
+        )
+        for margin_sec in margins_sec:
+            silent_parts = _build_silent_parts(starts, ends, total, sr, margin_sec)
+            results.append(
                 {
-                    "start_idx": start_idx,
-                    "end_idx": end_idx,
-                    "start_sec": start_time,
-                    "end_sec": end_time,
-                    "duration": duration,
+                    "threshold_db": threshold_db,
+                    "margin_sec": margin_sec,
+                    "silent_parts": silent_parts,
+                    "count": len(silent_parts),
+                    "total_silence_sec": float(silent_parts["duration"].sum()),
                 }
             )
-            is_silent = False
-        elif not non_silent[i] and not is_silent:
-            # Start of silent region
-            start_idx = i
-            is_silent = True
-
-    # if the audio ends with silence
-    if is_silent:
-        # end_inc is added to avoid trimming the pause at the end of the sentence
-        end_inc = 1.25
-        margin_samples = int(margin_samples * end_inc)
-        end_idx = len(y)
-        start_idx += margin_samples
-
-        start_time = start_idx / sr
-        end_time = end_idx / sr
-        duration = end_time - start_time
-        duration += silence_margin_sec * end_inc
-        silent_parts.append(
-            {
-                "start_idx": start_idx,
-                "end_idx": end_idx,
-                "start_sec": start_time,
-                "end_sec": end_time,
-                "duration": duration,
-            }
+    return results
+
+
+# ``librosa.amplitude_to_db`` clips levels to this range below the peak.
+_TOP_DB = 80.0
+
+
+def _chunk_silent_runs(task, silence_threshold_db, frame_length, hop_length):
+    """Find the silent runs of one range of envelope frames in a worker.
+
+    Only the samples behind frames ``[first, stop)`` are read, plus the
+    overlap a centred RMS frame needs on each side. Returns the runs in
+    global frame indices and the peak level of the range, without the
+    ``top_db`` clip that depends on the peak of the whole file.
+    """
+    import librosa
+
+    path, first, stop, n_samples = task
+    if frame_length:
+        # Frame k covers padded samples [k * hop, k * hop + frame_length).
+        pad = frame_length // 2
+        lo = first * hop_length - pad
+        hi = (stop - 1) * hop_length + frame_length - pad
+    else:
+        lo, hi = first, stop
+
+    y, _ = sf.read(
+        path, start=max(lo, 0), stop=min(hi, n_samples), dtype="float32", always_2d=True
+    )
+    # Same downmix as ``librosa.load``.
+    y = librosa.to_mono(y.T)
+
+    if frame_length:
+        y = np.pad(y, (max(-lo, 0), max(hi - n_samples, 0)))
+        levels = librosa.feature.rms(
+            y=y, frame_length=frame_length, hop_length=hop_length, center=False
+        )[0]
+    else:
+        levels = np.abs(y)
+    db = librosa.amplitude_to_db(levels, top_db=None)
+
+    starts, ends = _find_silent_runs(db > silence_threshold_db)
+    return starts + first, ends + first, db.max(initial=-np.inf)
+
+
+def get_silent_parts_parallel(
+    input_file_path,
+    silence_threshold_db=-40,
+    silence_margin_sec=0.15,
+    frame_length=None,
+    hop_length=None,
+    chunk_sec=60,
+    max_workers=None,
+):
+    """Find silent regions of one long file using several processes.
+
+    The file is split into ranges of about ``chunk_sec`` seconds that are
+    analysed in a process pool. Each worker reads only its own range, plus
+    the overlap needed by RMS frames at its edges. Regions that cross a
+    range boundary are merged afterwards, so the result is exactly that of
+    ``get_silent_parts(..., sr=None)`` with the same settings.
+
+    Audio is analysed at its native sample rate and must be readable by
+    ``soundfile``.
+
+    Args:
+        input_file_path: Path to the audio file.
+        silence_threshold_db: Samples at or below this level are considered silent.
+        silence_margin_sec: Margin applied to detected silence boundaries.
+        frame_length: RMS window length in samples, see ``get_silent_parts``.
+        hop_length: Samples between RMS frames, see ``get_silent_parts``.
+        chunk_sec: Approximate length of the range given to each task.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+
+    Returns:
+        A tuple of ``(silent_parts, sample_rate)`` with the same records as
+        ``get_silent_parts``.
+    """
+    info = sf.info(input_file_path)
+    sample_rate = info.samplerate
+    n_samples = info.frames
+
+    if frame_length:
+        if not hop_length:
+            hop_length = frame_length // 4
+        pad = frame_length // 2
+        n_frames = 1 + (n_samples + 2 * pad - frame_length) // hop_length
+    else:
+        hop_length = 1
+        n_frames = n_samples
+
+    chunk_frames = max(1, int(chunk_sec * sample_rate) // hop_length)
+    tasks = (
+        (input_file_path, first, min(first + chunk_frames, n_frames), n_samples)
+        for first in range(0, n_frames, chunk_frames)
+    )
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for (_, first, _, _), future in _iter_completed(
+            executor,
+            _chunk_silent_runs,
+            tasks,
+            max_workers * 2,
+            silence_threshold_db,
+            frame_length,
+            hop_length,
+        ):
+            chunks.append((first, *future.result()))
+    chunks.sort(key=lambda chunk: chunk[0])
+
+    peak_db = max((chunk[3] for chunk in chunks), default=-np.inf)
+    starts = np.concatenate([np.empty(0, np.int64)] + [c[1] for c in chunks])
+    ends = np.concatenate([np.empty(0, np.int64)] + [c[2] for c in chunks])
+    if peak_db - _TOP_DB > silence_threshold_db:
+        # The top_db clip lifts every level above the threshold.
+        starts = ends = np.empty(0, dtype=np.int64)
+    elif len(starts):
+        # Join runs that were cut at a range boundary.
+        split = ends[:-1] == starts[1:]
+        starts = starts[np.concatenate(([True], ~split))]
+        ends = ends[np.concatenate((~split, [True]))]
+
+    starts, ends, total = _frame_runs_to_samples(
+        starts, ends, n_frames, hop_length, n_samples
+    )
+    silent_parts = _build_silent_parts(
+        starts, ends, total, sample_rate, silence_margin_sec
+    )
+    return silent_parts, sample_rate
+
+
+def _envelope_cache_path(path, cache_dir):
+    """Return the sidecar path, or a path in ``cache_dir`` keyed by file path."""
+    if cache_dir is None:
+        return f"{os.fspath(path)}.envelope.npz"
+    key = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.envelope.npz")
+
+
+def _compute_level_envelope(path, hop_length, blocks_per_read=1024):
+    """Return ``(peak_db, n_samples)`` with one peak level per ``hop_length``.
+
+    The file is read in blocks, so memory use does not depend on its length.
+    """
+    import librosa
+
+    peaks = []
+    n_samples = 0
+    for block in sf.blocks(
+        path, blocksize=hop_length * blocks_per_read, dtype="float32"
+    ):
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        n_samples += len(block)
+        # Only the last block can be shorter than a whole number of frames.
+        block = np.pad(np.abs(block), (0, -len(block) % hop_length))
+        peaks.append(block.reshape(-1, hop_length).max(axis=1))
+
+    peak = np.concatenate(peaks) if peaks else np.empty(0, dtype=np.float32)
+    return librosa.amplitude_to_db(peak, top_db=None), n_samples
+
+
+def get_level_envelope(input_file_path, frame_rate=100, cache_dir=None):
+    """Return a file's peak level envelope, cached in a compact sidecar file.
+
+    The envelope holds the peak level in dB of each frame of
+    ``sample_rate / frame_rate`` samples and is stored as float16. It is
+    written next to the audio as ``<file>.envelope.npz``, or into
+    ``cache_dir`` when given, and recomputed when the file's size or
+    modification time, or ``frame_rate``, changes. Cache hits only stat the
+    file and do not open the audio.
+
+    Args:
+        input_file_path: Path to the audio file.
+        frame_rate: Envelope frames per second.
+        cache_dir: Optional shared directory for envelopes, for example when
+            the audio directory is read-only.
+
+    Returns:
+        A tuple of ``(envelope_db, sample_rate, hop_length, n_samples)``.
+        ``hop_length`` is the number of samples per envelope frame.
+    """
+    stat = os.stat(input_file_path)
+
+    # Cache hits are validated with ``os.stat`` alone, so they do not open
+    # the audio file.
+    cache_path = _envelope_cache_path(input_file_path, cache_dir)
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if (
+                "frame_rate" in cached.files
+                and int(cached["size"]) == stat.st_size
+                and int(cached["mtime_ns"]) == stat.st_mtime_ns
+                and float(cached["frame_rate"]) == frame_rate
+            ):
+                return (
+                    cached["envelope_db"],
+                    int(cached["sample_rate"]),
+                    int(cached["hop_length"]),
+                    int(cached["n_samples"]),
+                )
+
+    sample_rate = sf.info(input_file_path).samplerate
+    hop_length = max(1, round(sample_rate / frame_rate))
+    envelope_db, n_samples = _compute_level_envelope(input_file_path, hop_length)
+    envelope_db = envelope_db.astype(np.float16)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first so readers never see partial data.
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp_path,
+        envelope_db=envelope_db,
+        sample_rate=sample_rate,
+        frame_rate=frame_rate,
+        hop_length=hop_length,
+        n_samples=n_samples,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+    )
+    os.replace(tmp_path, cache_path)
+    return envelope_db, sample_rate, hop_length, n_samples
+
+
+def get_envelope_silent_parts(
+    input_file_path,
+    silence_threshold_db=-40,
+    silence_margin_sec=0.15,
+    frame_rate=100,
+    cache_dir=None,
+):
+    """Find silent regions from the cached level envelope.
+
+    Once the envelope exists, threshold queries do not touch the audio. A
+    frame is silent when its peak is at or below the threshold, so region
+    boundaries have the resolution of one envelope frame.
+
+    Args:
+        input_file_path: Path to the audio file.
+        silence_threshold_db: Frames at or below this level are considered silent.
+        silence_margin_sec: Margin applied to detected silence boundaries.
+        frame_rate: Envelope frames per second, see ``get_level_envelope``.
+        cache_dir: Optional shared envelope directory, see
+            ``get_level_envelope``.
+
+    Returns:
+        A tuple of ``(silent_parts, sample_rate)`` with records like those
+        of ``get_silent_parts``, indexed at the native sample rate.
+    """
+    envelope_db, sample_rate, hop_length, n_samples = get_level_envelope(
+        input_file_path, frame_rate, cache_dir
+    )
+    starts, ends, total = _envelope_silent_runs(
+        envelope_db, silence_threshold_db, hop_length, n_samples
+    )
+    silent_parts = _build_silent_parts(
+        starts, ends, total, sample_rate, silence_margin_sec
+    )
+    return silent_parts, sample_rate
+
+
+def _iter_pcm_blocks(source, sample_rate, block_size):
+    """Return ``(blocks, sample_rate)`` for a file path or an iterable of blocks."""
+    if isinstance(source, (str, os.PathLike)):
+        sample_rate = sf.info(source).samplerate
+        blocks = sf.blocks(source, blocksize=block_size, dtype="float32")
+        return blocks, sample_rate
+
+    if sample_rate is None:
+        raise ValueError("sample_rate is required when source is not a file path")
+    return source, sample_rate
+
+
+def _pcm_to_float(block):
+    """Return a float32 block, scaling integer PCM to ``[-1, 1]``."""
+    if block.dtype.kind == "i":
+        return block.astype(np.float32) / -np.iinfo(block.dtype).min
+    if block.dtype.kind == "u":
+        middle = (np.iinfo(block.dtype).max + 1) / 2
+        return (block.astype(np.float32) - middle) / middle
+    return block.astype(np.float32, copy=False)
+
+
+def iter_silent_parts(
+    source,
+    silence_threshold_db=-40,
+    silence_margin_sec=0.15,
+    sample_rate=None,
+    block_size=65536,
+):
+    """Yield silent regions while reading audio in fixed-size blocks.
+
+    Only one block is held in memory at a time, so memory use does not grow
+    with the length of the recording. A region that is still open at the end
+    of a block is carried over to the next one and yielded once it closes.
+
+    Audio is analysed at its native sample rate, and multichannel blocks are
+    averaged to mono. Unlike ``get_silent_parts``, levels are not clipped
+    relative to the loudest sample (``top_db``), which makes no difference
+    unless the threshold is more than 80 dB below the peak.
+
+    Args:
+        source: Path to an audio file, or an iterable of PCM blocks such as
+            arrays read from a pipe. Blocks are 1-D mono arrays or
+            ``(frames, channels)`` arrays. Float blocks are expected in
+            ``[-1, 1]``. Integer blocks, for example from
+            ``np.frombuffer(data, "<i2")``, are scaled to that range like
+            ``soundfile`` does, and unsigned ones are centred first.
+        silence_threshold_db: Samples at or below this level are considered silent.
+        silence_margin_sec: Margin applied to detected silence boundaries.
+        sample_rate: Sample rate of the blocks. Required unless ``source`` is
+            a file path.
+        block_size: Number of frames read per block from a file.
+
+    Yields:
+        One record per silent region with the same fields as the records
+        returned by ``get_silent_parts``.
+    """
+    import librosa
+
+    blocks, sr = _iter_pcm_blocks(source, sample_rate, block_size)
+
+    offset = 0
+    open_start = None
+    for block in blocks:
+        block = _pcm_to_float(np.asarray(block))
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        if not len(block):
+            continue
+
+        db = librosa.amplitude_to_db(np.abs(block), top_db=None)
+        starts, ends = _find_silent_runs(db > silence_threshold_db)
+        starts += offset
+        ends += offset
+
+        if open_start is not None:
+            if len(starts) and starts[0] == offset:
+                starts[0] = open_start
+            else:
+                # The carried region closed at the first sample of this block.
+                starts = np.insert(starts, 0, open_start)
+                ends = np.insert(ends, 0, offset)
+
+        offset += len(block)
+        open_start = None
+        if len(ends) and ends[-1] == offset:
+            open_start = starts[-1]
+            starts = starts[:-1]
+            ends = ends[:-1]
+
+        yield from _build_silent_parts(starts, ends, None, sr, silence_margin_sec)
+
+    if open_start is not None:
+        yield from _build_silent_parts(
+            [open_start], [offset], offset, sr, silence_margin_sec
         )
-    return silent_parts, y, sr
+
+
+def _spectrogram_params(fft_size, hop_size, window_size):
+    """Resolve the default hop and window sizes used for spectrograms."""
+    # default values taken from the librosa documentation
+    if not window_size:
+        window_size = fft_size
+
+    if not hop_size:
+        hop_size = window_size // 4
+
+    return fft_size, hop_size, window_size
+
+
+def _file_sha256(path):
+    """Return the hex SHA-256 digest of a file's content."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _spectrogram_cache_path(
+    file, cache_dir, fft_size, hop_size, window_size, mono
+):
+    """Return the cache file for a file's content and STFT parameters."""
+    key = f"{_file_sha256(file)}-{fft_size}-{hop_size}-{window_size}"
+    if mono:
+        key += "-mono"
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def compute_spectrogram(
+    file,
+    fft_size=2048,
+    hop_size=None,
+    window_size=None,
+    cache_dir=None,
+    mono=False,
+):
+    """Compute a spectrogram in dB without plotting it.
+
+    Multichannel files are transformed in one batched STFT call, one
+    spectrogram per channel, unless ``mono`` is set.
+
+    Args:
+        file: Path to the input audio file.
+        fft_size: Number of samples used for each FFT.
+        hop_size: Samples between frames. Defaults to one quarter of the window.
+        window_size: FFT window length. Defaults to ``fft_size``.
+        cache_dir: Optional directory for cached results. Entries are keyed
+            by the SHA-256 of the file content and the STFT parameters, so
+            repeated calls skip decoding and the STFT entirely.
+        mono: If True, multichannel audio is averaged to mono before the
+            transform, which divides the STFT cost by the channel count.
+
+    Returns:
+        A tuple of ``(spectrogram_db, sample_rate)``. ``spectrogram_db`` has
+        shape ``(1 + fft_size // 2, frames)`` for mono audio and
+        ``(channels, 1 + fft_size // 2, frames)`` otherwise. Values are
+        relative to the maximum over all channels.
+    """
+    fft_size, hop_size, window_size = _spectrogram_params(
+        fft_size, hop_size, window_size
+    )
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = _spectrogram_cache_path(
+            file, cache_dir, fft_size, hop_size, window_size, mono
+        )
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                return cached["spectrogram_db"], int(cached["sample_rate"])
+
+    import librosa
+
+    signal, sample_rate = sf.read(file)
+    if signal.ndim > 1:
+        # librosa transforms the last axis, so channels go first.
+        signal = signal.mean(axis=1) if mono else np.ascontiguousarray(signal.T)
+
+    stft = librosa.stft(
+        signal,
+        n_fft=fft_size,
+        hop_length=hop_size,
+        win_length=window_size,
+        center=False,
+    )
+    spectrogram = np.abs(stft)
+    spectrogram_db = librosa.amplitude_to_db(spectrogram, ref=np.max)
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so readers never see partial data.
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, spectrogram_db=spectrogram_db, sample_rate=sample_rate)
+        os.replace(tmp_path, cache_path)
+
+    return spectrogram_db, sample_rate
+
+
+def _iter_stft_blocks(snd, fft_size, hop_size, window_size, n_frames, block_frames):
+    """Yield ``(first, last, magnitude)`` for blocks of non-centred STFT frames.
+
+    Frame ``k`` covers samples ``[k * hop_size, k * hop_size + fft_size)``
+    of the open ``soundfile.SoundFile``. Each block reads only the samples
+    it needs, and multichannel audio is averaged to mono.
+    """
+    import librosa
+
+    for first in range(0, n_frames, block_frames):
+        last = min(first + block_frames, n_frames)
+        snd.seek(first * hop_size)
+        block = snd.read((last - first - 1) * hop_size + fft_size)
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+
+        magnitude = np.abs(
+            librosa.stft(
+                block,
+                n_fft=fft_size,
+                hop_length=hop_size,
+                win_length=window_size,
+                center=False,
+            )
+        )
+        yield first, last, magnitude
+
+
+def compute_stft_memmap(
+    file,
+    out_path,
+    fft_size=2048,
+    hop_size=None,
+    window_size=None,
+    block_frames=4096,
+    to_db=False,
+):
+    """Compute STFT magnitudes in overlapping blocks and store them in a ``.npy``.
+
+    Only ``block_frames`` STFT frames are computed at a time. Each block reads
+    just the samples it needs, so peak memory depends on the block size and
+    not on the length of the file. Frames match ``compute_spectrogram``
+    exactly. Multichannel audio is averaged to mono.
+
+    Args:
+        file: Path to the input audio file.
+        out_path: Output ``.npy`` path.
+        fft_size: Number of samples used for each FFT.
+        hop_size: Samples between frames. Defaults to one quarter of the window.
+        window_size: FFT window length. Defaults to ``fft_size``.
+        block_frames: Number of STFT frames computed per block.
+        to_db: If True, magnitudes are converted in place to dB relative to
+            their maximum, as returned by ``compute_spectrogram``.
+
+    Returns:
+        A tuple of ``(spectrogram, sample_rate)``. ``spectrogram`` is a
+        read-only ``np.memmap`` of float32 values with shape
+        ``(1 + fft_size // 2, frames)``.
+    """
+    import librosa
+
+    fft_size, hop_size, window_size = _spectrogram_params(
+        fft_size, hop_size, window_size
+    )
+
+    with sf.SoundFile(file) as snd:
+        sample_rate = snd.samplerate
+        if snd.frames < fft_size:
+            raise ValueError(
+                f"Audio has {snd.frames} samples, fewer than fft_size={fft_size}"
+            )
+        n_frames = 1 + (snd.frames - fft_size) // hop_size
+
+        out = np.lib.format.open_memmap(
+            out_path,
+            mode="w+",
+            dtype=np.float32,
+            shape=(1 + fft_size // 2, n_frames),
+        )
+
+        peak = 0.0
+        for first, last, magnitude in _iter_stft_blocks(
+            snd, fft_size, hop_size, window_size, n_frames, block_frames
+        ):
+            out[:, first:last] = magnitude
+            peak = max(peak, float(magnitude.max()))
+
+    if to_db:
+        for first in range(0, n_frames, block_frames):
+            block = out[:, first : first + block_frames]
+            # top_db is relative to the global peak, which is 0 dB here.
+            block_db = librosa.amplitude_to_db(block, ref=peak, top_db=None)
+            out[:, first : first + block_frames] = np.maximum(block_db, -80.0)
+
+    out.flush()
+    del out
+    return np.load(out_path, mmap_mode="r"), sample_rate
 
 
 def get_spectrogram(
@@ -103,6 +812,9 @@ def get_spectrogram(
     fig_size=(10, 4),
     show_save=(False, True),
     save_params=None,
+    cache_dir=None,
+    block_frames=None,
+    mono=False,
 ):
     """Create a log-frequency spectrogram for an audio file.
 
@@ -117,43 +829,70 @@ def get_spectrogram(
         fig_size: Matplotlib figure size.
         show_save: ``(show, save)`` flags controlling display and file output.
         save_params: Optional keyword arguments passed to ``plt.savefig``.
+        cache_dir: Optional spectrogram cache directory, see
+            ``compute_spectrogram``.
+        block_frames: If set, the STFT is computed in blocks of this many
+            frames into a temporary memory-mapped file, see
+            ``compute_stft_memmap``. Useful for very long recordings.
+            Multichannel audio is averaged to mono in this mode.
+        mono: If True, multichannel audio is averaged to mono before the
+            transform. Otherwise each channel is drawn in its own panel.
     """
-    signal, sample_rate = sf.read(file)
-
-    # default values taken from the librosa documentation
-    if not window_size:
-        window_size = fft_size
-
-    if not hop_size:
-        hop_size = window_size // 4
+    import librosa.display
+    import matplotlib.pyplot as plt
 
-    stft = librosa.stft(
-        signal,
-        n_fft=fft_size,
-        hop_length=hop_size,
-        win_length=window_size,
-        center=False,
+    fft_size, hop_size, window_size = _spectrogram_params(
+        fft_size, hop_size, window_size
     )
-    spectrogram = np.abs(stft)
-    spectrogram_db = librosa.amplitude_to_db(spectrogram, ref=np.max)
+    if block_frames:
+        tmp_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        spectrogram_db, sample_rate = compute_stft_memmap(
+            file,
+            os.path.join(tmp_dir.name, "spectrogram.npy"),
+            fft_size,
+            hop_size,
+            window_size,
+            block_frames=block_frames,
+            to_db=True,
+        )
+    else:
+        tmp_dir = None
+        spectrogram_db, sample_rate = compute_spectrogram(
+            file, fft_size, hop_size, window_size, cache_dir=cache_dir, mono=mono
+        )
 
-    plt.figure(figsize=fig_size)
-    img = librosa.display.specshow(
-        spectrogram_db,
-        y_axis="log",
-        x_axis="time",
-        sr=sample_rate,
-        hop_length=hop_size,
-        cmap="inferno",
-    )
-    plt.xlabel("Time [s]")
-    plt.ylabel("Frequency [Hz]")
-    if xticks:
-        plt.xticks(xticks)
-    if yticks:
-        plt.yticks(yticks)
+    if spectrogram_db.ndim == 3:
+        # One panel per channel, sharing the time axis and the colorbar.
+        _, axes = plt.subplots(
+            len(spectrogram_db), 1, figsize=fig_size, sharex=True, squeeze=False
+        )
+        axes = axes[:, 0]
+    else:
+        plt.figure(figsize=fig_size)
+        axes = [plt.gca()]
+        spectrogram_db = [spectrogram_db]
 
-    plt.colorbar(img, format="%+2.f dBFS")
+    for channel, ax in enumerate(axes):
+        img = librosa.display.specshow(
+            spectrogram_db[channel],
+            y_axis="log",
+            x_axis="time",
+            sr=sample_rate,
+            hop_length=hop_size,
+            cmap="inferno",
+            ax=ax,
+        )
+        ax.set_xlabel("")
+        ax.set_ylabel("Frequency [Hz]")
+        if len(axes) > 1:
+            ax.set_title(f"Channel {channel + 1}", fontsize="small")
+        if xticks:
+            ax.set_xticks(xticks)
+        if yticks:
+            ax.set_yticks(yticks)
+    axes[-1].set_xlabel("Time [s]")
+
+    plt.colorbar(img, ax=list(axes), format="%+2.f dBFS")
 
     SAVE_PARAMS = {"dpi": 300, "bbox_inches": "tight", "transparent": True}
     if show_save[1]:
@@ -166,34 +905,371 @@ def get_spectrogram(
         plt.show()
     plt.close()
 
+    if tmp_dir is not None:
+        del spectrogram_db
+        tmp_dir.cleanup()
+
+
+# Headers are parsed from at most this many bytes at the start of a file.
+_HEADER_READ_SIZE = 4096
+_HEADER_EXTENSIONS = (".wav", ".wave", ".flac")
+# PCM, IEEE float and WAVE_FORMAT_EXTENSIBLE store whole frames in "data".
+_WAV_FRAME_FORMATS = {0x0001, 0x0003, 0xFFFE}
+# Files probed per worker task in ``get_total_duration``.
+_PROBE_BATCH_SIZE = 256
+# Default duration histogram bins, in seconds.
+_DURATION_HISTOGRAM_EDGES = (0, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _parse_wav_header(header, file_size):
+    """Read ``(frames, samplerate, channels)`` from RIFF chunk headers."""
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(header):
+        chunk_id = header[pos : pos + 4]
+        (chunk_size,) = struct.unpack_from("<I", header, pos + 4)
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            if body + 16 > len(header):
+                return None
+            fmt = struct.unpack_from("<HHIIH", header, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            audio_format, channels, samplerate, _, block_align = fmt
+            # Sizes written by interrupted recorders can exceed the file.
+            if (
+                audio_format not in _WAV_FRAME_FORMATS
+                or not block_align
+                or body + chunk_size > file_size
+            ):
+                return None
+            return chunk_size // block_align, samplerate, channels
+
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _parse_flac_header(header):
+    """Read ``(frames, samplerate, channels)`` from the FLAC STREAMINFO block."""
+    pos = 0
+    if header[:3] == b"ID3" and len(header) >= 10:
+        # Skip a leading ID3v2 tag; its size is stored as a syncsafe integer.
+        size = 0
+        for byte in header[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        pos = 10 + size
+
+    if header[pos : pos + 4] != b"fLaC" or pos + 8 + 18 > len(header):
+        return None
+    if header[pos + 4] & 0x7F != 0:
+        return None
+
+    (packed,) = struct.unpack_from(">Q", header, pos + 8 + 10)
+    samplerate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    frames = packed & 0xFFFFFFFFF
+    if not samplerate or not frames:
+        return None
+    return frames, samplerate, channels
+
+
+def _read_header_info(path):
+    """Return ``(frames, samplerate, channels)`` from WAV or FLAC headers.
+
+    Only the first few KB of the file are read. ``None`` is returned for other
+    formats and for headers that cannot be trusted, so callers can fall back
+    to libsndfile.
+    """
+    if not str(path).lower().endswith(_HEADER_EXTENSIONS):
+        return None
+
+    with open(path, "rb") as f:
+        header = f.read(_HEADER_READ_SIZE)
+        file_size = os.fstat(f.fileno()).st_size
+
+    if header[:4] == b"RIFF":
+        return _parse_wav_header(header, file_size)
+    return _parse_flac_header(header)
+
+
+def _probe_audio(path):
+    """Return ``(frames, samplerate, channels)`` for an audio file."""
+    info = _read_header_info(path)
+    if info is not None:
+        return info
+
+    info = sf.info(path)
+    return info.frames, info.samplerate, info.channels
+
 
 def get_duration(path):
     """Return an audio file's duration in seconds, or ``0`` if it cannot be read."""
     try:
-        info = sf.info(path)
-        return info.frames / info.samplerate  # duration in seconds
+        frames, samplerate, _ = _probe_audio(path)
+        return frames / samplerate  # duration in seconds
     except Exception as e:
         print(f"Error reading {path}: {e}")
         return 0
 
 
-def get_total_duration(directory, file_ext=".wav", max_workers=50):
+def _scan_audio_entries(directory, file_ext):
+    """Yield ``os.DirEntry`` objects for files below ``directory``.
+
+    Directories are read lazily with ``os.scandir``, so the scan starts
+    producing files immediately and never holds the full listing. Like
+    ``os.walk``, unreadable directories are skipped and symlinked
+    directories are not followed.
+    """
+    stack = [os.fspath(directory)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                    elif entry.name.endswith(file_ext):
+                        yield entry
+        except OSError:
+            continue
+
+
+def _iter_audio_files(directory, file_ext):
+    """Yield paths below ``directory`` whose names end with ``file_ext``."""
+    for entry in _scan_audio_entries(directory, file_ext):
+        yield entry.path
+
+
+def _batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _iter_completed(executor, fn, items, max_in_flight, *args):
+    """Submit ``fn(item, *args)`` for each item and yield ``(item, future)``.
+
+    At most ``max_in_flight`` futures are pending at any time, so ``items``
+    can be a lazy iterator over millions of entries.
+    """
+    pending = {}
+    items = iter(items)
+    exhausted = False
+
+    while pending or not exhausted:
+        while not exhausted and len(pending) < max_in_flight:
+            item = next(items, None)
+            if item is None:
+                exhausted = True
+                break
+            pending[executor.submit(fn, item, *args)] = item
+
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+
+
+def _probe_or_empty(path):
+    """Like ``_probe_audio`` but returns ``None`` for unreadable files."""
+    try:
+        return _probe_audio(path)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None
+
+
+def _probe_batch(batch):
+    """Probe a batch of ``(path, size, mtime_ns, cached_info)`` items.
+
+    Cached info is reused as is. Returns ``(item, info, probed)`` tuples,
+    where ``probed`` is True for files that were probed successfully.
+    Unreadable files get zeros and ``probed`` False, so they are not cached.
+    """
+    results = []
+    for item in batch:
+        info = item[3]
+        probed = False
+        if info is None:
+            info = _probe_or_empty(item[0])
+            probed = info is not None
+            if not probed:
+                info = (0, 0, 0)
+        results.append((item, info, probed))
+    return results
+
+
+def _open_duration_cache(cache_path):
+    """Open the SQLite duration index, creating its table if needed."""
+    conn = sqlite3.connect(str(cache_path))
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audio_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            frames INTEGER NOT NULL,
+            samplerate INTEGER NOT NULL,
+            channels INTEGER NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def _load_duration_cache(conn, directory, file_ext):
+    """Return cached rows for files under ``directory`` keyed by path."""
+    prefix = os.path.join(directory, "")
+    rows = conn.execute(
+        "SELECT path, size, mtime_ns, frames, samplerate, channels "
+        "FROM audio_files WHERE substr(path, 1, ?) = ?",
+        (len(prefix), prefix),
+    )
+    return {row[0]: row[1:] for row in rows if row[0].endswith(file_ext)}
+
+
+def _iter_durations(directory, file_ext, max_workers, cache_path=None):
+    """Yield ``(path, frames, samplerate, channels)`` for every matching file.
+
+    Files are scanned lazily and probed in batches on a thread pool with a
+    bounded number of batches in flight. With ``cache_path``, unchanged
+    files are answered from the SQLite index, probed files are written back,
+    and index rows for removed files are deleted once the scan completes.
+    Files that fail to probe are not written, so they are retried next time.
+    """
+    conn = None
+    cached = {}
+    if cache_path is not None:
+        directory = os.path.abspath(directory)
+        conn = _open_duration_cache(cache_path)
+        cached = _load_duration_cache(conn, directory, file_ext)
+
+    def items():
+        for entry in _scan_audio_entries(directory, file_ext):
+            if conn is None:
+                yield entry.path, None, None, None
+                continue
+
+            stat = entry.stat()
+            row = cached.pop(entry.path, None)
+            if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                yield entry.path, stat.st_size, stat.st_mtime_ns, row[2:]
+            else:
+                yield entry.path, stat.st_size, stat.st_mtime_ns, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _, future in _iter_completed(
+                executor,
+                _probe_batch,
+                _batched(items(), _PROBE_BATCH_SIZE),
+                max_workers * 2,
+            ):
+                updates = []
+                for (path, size, mtime_ns, _), info, probed in future.result():
+                    if probed and conn is not None:
+                        updates.append((path, size, mtime_ns, *info))
+                    yield (path, *info)
+
+                if updates:
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO audio_files "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            updates,
+                        )
+
+        if conn is not None:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM audio_files WHERE path = ?",
+                    ((path,) for path in cached),
+                )
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def get_total_duration(directory, file_ext=".wav", max_workers=50, cache_path=None):
     """Return the combined duration in seconds.
 
     Args:
         directory: Directory searched recursively for audio files.
         file_ext: Filename extension to include.
         max_workers: Maximum number of threads used to inspect files.
+        cache_path: Optional SQLite file used as a persistent duration index.
+            Files are keyed by path, size and modification time, so a re-scan
+            only opens new or changed files and drops removed ones.
     """
-    flac_files = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(file_ext):
-                flac_files.append(os.path.join(root, file))
-
     total_seconds = 0
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(get_duration, path) for path in flac_files]
-        for f in as_completed(futures):
-            total_seconds += f.result()
+    for _, frames, samplerate, _ in _iter_durations(
+        directory, file_ext, max_workers, cache_path
+    ):
+        if samplerate:
+            total_seconds += frames / samplerate
     return total_seconds # duration in seconds
+
+
+def get_duration_stats(
+    directory,
+    file_ext=".wav",
+    max_workers=50,
+    cache_path=None,
+    histogram_edges=_DURATION_HISTOGRAM_EDGES,
+):
+    """Collect duration totals and distributions in a single directory scan.
+
+    Args:
+        directory: Directory searched recursively for audio files.
+        file_ext: Filename extension to include.
+        max_workers: Maximum number of threads used to inspect files.
+        cache_path: Optional SQLite duration index, as in ``get_total_duration``.
+        histogram_edges: Increasing bin edges in seconds for the duration
+            histogram. Durations past the last edge go into the last bin.
+
+    Returns:
+        A dictionary with ``files``, ``unreadable`` and ``total_seconds``, the
+        groups ``by_directory`` (relative to ``directory``), ``by_samplerate``
+        and ``by_channels`` mapping each key to ``{"files", "seconds"}``, and
+        a ``histogram`` with ``edges`` and per-bin ``counts``.
+    """
+    edges = list(histogram_edges)
+    counts = [0] * (len(edges) - 1)
+    groups = {"by_directory": {}, "by_samplerate": {}, "by_channels": {}}
+    stats = {"files": 0, "unreadable": 0, "total_seconds": 0.0}
+
+    root = os.path.abspath(directory)
+    for path, frames, samplerate, channels in _iter_durations(
+        directory, file_ext, max_workers, cache_path
+    ):
+        stats["files"] += 1
+        if not samplerate:
+            stats["unreadable"] += 1
+            continue
+
+        seconds = frames / samplerate
+        stats["total_seconds"] += seconds
+
+        subdir = os.path.relpath(os.path.dirname(os.path.abspath(path)), root)
+        for name, key in (
+            ("by_directory", subdir),
+            ("by_samplerate", samplerate),
+            ("by_channels", channels),
+        ):
+            group = groups[name].setdefault(key, {"files": 0, "seconds": 0.0})
+            group["files"] += 1
+            group["seconds"] += seconds
+
+        bin_idx = bisect_right(edges, seconds) - 1
+        counts[min(max(bin_idx, 0), len(counts) - 1)] += 1
+
+    stats.update(groups)
+    stats["histogram"] = {"edges": edges, "counts": counts}
+    return stats
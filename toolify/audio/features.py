@@ -0,0 +1,262 @@
+"""Sharded, memory-mapped spectrogram feature stores for training data."""
+
+import json
+import os
+import time
+import uuid
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .audio import _iter_audio_files, _iter_completed, _spectrogram_params
+
+try:
+    from ..tools import pct
+except ImportError:
+    from toolify.tools import pct
+
+__all__ = [
+    "FeatureStore",
+    "build_feature_store",
+]
+
+
+_INDEX_NAME = "index.json"
+_FEATURES = ("log_mel", "linear")
+
+
+def _extract_features(path, params):
+    """Return ``(frames, features)`` float32 features of one file in a worker."""
+    import librosa
+
+    y, sr = librosa.load(path, sr=params["sr"])
+    if params["feature"] == "log_mel":
+        mel = librosa.feature.melspectrogram(
+            y=y,
+            sr=sr,
+            n_fft=params["fft_size"],
+            hop_length=params["hop_size"],
+            win_length=params["window_size"],
+            n_mels=params["n_mels"],
+        )
+        features = librosa.power_to_db(mel, top_db=None)
+    else:
+        stft = librosa.stft(
+            y,
+            n_fft=params["fft_size"],
+            hop_length=params["hop_size"],
+            win_length=params["window_size"],
+        )
+        features = librosa.amplitude_to_db(np.abs(stft), top_db=None)
+    # Time-major rows, so utterances are contiguous slices of a shard.
+    return np.ascontiguousarray(features.T, dtype=np.float32)
+
+
+def _save_npy(path, array):
+    """Save an array through a temporary file so readers never see partial data."""
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def build_feature_store(
+    directory,
+    store_dir,
+    file_ext=".wav",
+    feature="log_mel",
+    sr=16000,
+    fft_size=512,
+    hop_size=160,
+    window_size=400,
+    n_mels=80,
+    shard_size_mb=256,
+    max_workers=None,
+    verbose=True,
+):
+    """Extract spectrogram features for a directory into sharded ``.npy`` files.
+
+    Files are processed in a process pool. Each utterance's features are
+    stored as a contiguous ``(frames, features)`` float32 block in one shard,
+    and ``index.json`` records the shard and row range of every utterance.
+    Read the store with ``FeatureStore``.
+
+    Shards of each build get new names, and ``index.json`` is replaced only
+    once they are all written, so a store being rebuilt keeps serving its
+    previous contents and an interrupted rebuild leaves it unchanged. The
+    shards of the previous build are kept, so a ``FeatureStore`` opened
+    before the rebuild keeps working until the next one.
+
+    Args:
+        directory: Directory searched recursively for audio files.
+        store_dir: Output directory for the shards and the index. An
+            existing store there is replaced.
+        file_ext: Filename extension to include.
+        feature: ``"log_mel"`` for a log-mel spectrogram in dB, or
+            ``"linear"`` for STFT magnitudes in dB.
+        sr: Sample rate the audio is resampled to. Use ``None`` to keep the
+            native rate.
+        fft_size: Number of samples used for each FFT.
+        hop_size: Samples between frames. Defaults to one quarter of the window.
+        window_size: FFT window length. Defaults to ``fft_size``.
+        n_mels: Number of mel bands for ``"log_mel"``.
+        shard_size_mb: Approximate size of each shard. Shards are buffered in
+            memory before they are written.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+        verbose: If True, shows progress and prints a summary.
+
+    Returns:
+        A dictionary with the counts of ``processed`` and ``failed`` files,
+        the ``errors`` per failed path, the number of ``shards``, the total
+        ``frames`` and the elapsed ``seconds``.
+    """
+    if feature not in _FEATURES:
+        raise ValueError(f"feature must be one of {_FEATURES}, got {feature!r}")
+
+    directory = os.fspath(directory)
+    store_dir = os.fspath(store_dir)
+    fft_size, hop_size, window_size = _spectrogram_params(
+        fft_size, hop_size, window_size
+    )
+    params = {
+        "feature": feature,
+        "sr": sr,
+        "fft_size": fft_size,
+        "hop_size": hop_size,
+        "window_size": window_size,
+        "n_mels": n_mels,
+    }
+    os.makedirs(store_dir, exist_ok=True)
+    shard_bytes = shard_size_mb * 1024 * 1024
+    build_id = uuid.uuid4().hex[:8]
+
+    shards = []
+    entries = {}
+    pending = []
+    pending_rows = 0
+    errors = {}
+
+    def flush():
+        nonlocal pending, pending_rows
+        if not pending:
+            return
+        name = f"shard_{build_id}_{len(shards):05d}.npy"
+        _save_npy(os.path.join(store_dir, name), np.concatenate(pending))
+        shards.append(name)
+        pending = []
+        pending_rows = 0
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if verbose:
+        from tqdm import tqdm
+
+        progress = tqdm(desc="Features", unit="file")
+
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for path, future in _iter_completed(
+                executor,
+                _extract_features,
+                _iter_audio_files(directory, file_ext),
+                max_workers * 4,
+                params,
+            ):
+                try:
+                    features = future.result()
+                except Exception as exc:
+                    errors[path] = str(exc)
+                    if verbose:
+                        pct(f"Error processing {path}: {exc}", "red")
+                else:
+                    key = os.path.relpath(path, directory)
+                    entries[key] = [
+                        len(shards),
+                        pending_rows,
+                        pending_rows + len(features),
+                    ]
+                    pending.append(features)
+                    pending_rows += len(features)
+                    if pending_rows * features.shape[1] * 4 >= shard_bytes:
+                        flush()
+                if verbose:
+                    progress.update()
+        flush()
+    finally:
+        if verbose:
+            progress.close()
+
+    # Readers opened on the previous build map its shards lazily, so they are
+    # kept for one more build. Only older generations are removed.
+    index_path = os.path.join(store_dir, _INDEX_NAME)
+    keep = set(shards)
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            keep.update(json.load(f)["shards"])
+
+    index = {"params": params, "shards": shards, "entries": entries}
+    tmp_path = os.path.join(store_dir, f"{_INDEX_NAME}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+
+    for name in os.listdir(store_dir):
+        if name.startswith("shard_") and name.endswith(".npy") and name not in keep:
+            os.remove(os.path.join(store_dir, name))
+
+    stats = {
+        "processed": len(entries),
+        "failed": len(errors),
+        "errors": errors,
+        "shards": len(shards),
+        "frames": sum(stop - start for _, start, stop in entries.values()),
+        "seconds": time.perf_counter() - start_time,
+    }
+    if verbose:
+        pct(
+            f"Stored {stats['processed']} files in {stats['shards']} shards, "
+            f"failed {stats['failed']}",
+            "green",
+        )
+    return stats
+
+
+class FeatureStore(Mapping):
+    """Read-only access to a store written by ``build_feature_store``.
+
+    The store behaves like a dictionary from each audio path, relative to
+    the source directory, to its ``(frames, features)`` array. Arrays are
+    views into memory-mapped shards, so no data is copied or read from disk
+    until it is used.
+
+    Args:
+        store_dir: Directory containing the shards and ``index.json``.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = os.fspath(store_dir)
+        with open(os.path.join(self.store_dir, _INDEX_NAME), encoding="utf-8") as f:
+            index = json.load(f)
+        self.params = index["params"]
+        self._shard_names = index["shards"]
+        self._entries = index["entries"]
+        self._shards = {}
+
+    def _shard(self, shard):
+        """Return a shard's memory map, opening it on first use."""
+        if shard not in self._shards:
+            path = os.path.join(self.store_dir, self._shard_names[shard])
+            self._shards[shard] = np.load(path, mmap_mode="r")
+        return self._shards[shard]
+
+    def __getitem__(self, key):
+        shard, start, stop = self._entries[os.fspath(key)]
+        return self._shard(shard)[start:stop]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
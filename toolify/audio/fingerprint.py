@@ -0,0 +1,358 @@
+"""Spectral-peak fingerprints and an on-disk duplicate index."""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .audio import _iter_completed, _scan_audio_entries
+
+try:
+    from ..tools import pct
+except ImportError:
+    from toolify.tools import pct
+
+__all__ = [
+    "build_fingerprint_index",
+    "find_duplicates",
+]
+
+
+# Fingerprints are computed on 8 kHz mono audio, one frame per 32 ms.
+_FP_SAMPLE_RATE = 8000
+_FP_FFT_SIZE = 1024
+_FP_HOP_SIZE = 256
+# Peaks are local maxima in a (frequency, time) neighbourhood of this size
+# and no more than this far below the loudest point of the file.
+_FP_NEIGHBOURHOOD = (15, 9)
+_FP_FLOOR_DB = -35.0
+# Each peak is paired with the next few peaks less than 64 frames later.
+_FP_FAN_OUT = 5
+_FP_MAX_DT = 63
+# Bumped whenever hashes change, so older indexes are rebuilt.
+_FP_INDEX_VERSION = 2
+
+
+def _max_filter(values, size, axis):
+    """Return the maximum over a centred window of ``size`` along ``axis``."""
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (size // 2, size // 2)
+    padded = np.pad(values, pad, constant_values=-np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, size, axis=axis)
+    return windows.max(axis=-1)
+
+
+def _fingerprint(path):
+    """Return ``(hashes, times)`` of the spectral-peak pairs of one file.
+
+    Each hash packs the frequency bins of two nearby peaks, 10 bits each,
+    and the number of frames between them in 6 bits. ``times`` holds the
+    frame of the first peak.
+    """
+    import librosa
+
+    y, _ = librosa.load(path, sr=_FP_SAMPLE_RATE)
+    magnitude = np.abs(librosa.stft(y, n_fft=_FP_FFT_SIZE, hop_length=_FP_HOP_SIZE))
+    if not magnitude.size or not magnitude.max():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    db = librosa.amplitude_to_db(magnitude, ref=np.max, top_db=None)
+
+    local_max = _max_filter(db, _FP_NEIGHBOURHOOD[0], axis=0)
+    local_max = _max_filter(local_max, _FP_NEIGHBOURHOOD[1], axis=1)
+    freqs, frames = np.nonzero((db == local_max) & (db > _FP_FLOOR_DB))
+    order = np.lexsort((freqs, frames))
+    freqs = freqs[order].astype(np.int64)
+    frames = frames[order].astype(np.int64)
+
+    hashes = []
+    times = []
+    for k in range(1, _FP_FAN_OUT + 1):
+        dt = frames[k:] - frames[:-k]
+        keep = dt <= _FP_MAX_DT
+        hashes.append(
+            (freqs[:-k][keep] << 16) | (freqs[k:][keep] << 6) | dt[keep]
+        )
+        times.append(frames[:-k][keep])
+    return np.concatenate(hashes), np.concatenate(times)
+
+
+def _fingerprint_task(item):
+    """Fingerprint the file of one ``(path, size, mtime_ns, row)`` scan item."""
+    return _fingerprint(item[0])
+
+
+def _open_fingerprint_index(index_path):
+    """Open the SQLite fingerprint index, creating its tables if needed.
+
+    An index written with another hash layout is emptied, so every file is
+    fingerprinted again.
+    """
+    conn = sqlite3.connect(str(index_path))
+    if conn.execute("PRAGMA user_version").fetchone()[0] != _FP_INDEX_VERSION:
+        conn.executescript(
+            f"""
+            DROP TABLE IF EXISTS hashes;
+            DROP TABLE IF EXISTS files;
+            PRAGMA user_version = {_FP_INDEX_VERSION};
+            """
+        )
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            hashes INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS hashes (
+            hash INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            time INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash);
+        CREATE INDEX IF NOT EXISTS hashes_by_file ON hashes (file_id);
+        """
+    )
+    return conn
+
+
+def _open_fingerprint_index_readonly(index_path):
+    """Open an existing fingerprint index for queries only.
+
+    Raises:
+        FileNotFoundError: If there is no index at ``index_path``.
+        ValueError: If the index was written with another hash layout.
+    """
+    path = Path(index_path).absolute()
+    if not path.is_file():
+        raise FileNotFoundError(f"No fingerprint index at {path}")
+
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version != _FP_INDEX_VERSION:
+        conn.close()
+        raise ValueError(
+            f"Fingerprint index {path} has version {version}, expected "
+            f"{_FP_INDEX_VERSION}. Rebuild it with build_fingerprint_index."
+        )
+    return conn
+
+
+def _remove_file(conn, file_id):
+    """Delete a file and its hashes from the index."""
+    conn.execute("DELETE FROM hashes WHERE file_id = ?", (file_id,))
+    conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+
+def build_fingerprint_index(
+    directory,
+    index_path,
+    file_ext=".wav",
+    max_workers=None,
+    verbose=True,
+):
+    """Fingerprint every audio file in a directory into an SQLite index.
+
+    Each file is reduced to hashes of pairs of nearby spectral peaks, which
+    survive re-encoding, resampling, gain changes and trimming. Files are
+    fingerprinted in a process pool. The index is incremental: files whose
+    size and modification time are unchanged are skipped, changed files are
+    fingerprinted again, and files that no longer exist are removed. Query
+    it with ``find_duplicates``.
+
+    Args:
+        directory: Directory searched recursively for audio files.
+        index_path: Path of the SQLite index. It can hold several directories.
+        file_ext: Filename extension to include.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+        verbose: If True, shows progress and prints a summary.
+
+    Returns:
+        A dictionary with the counts of ``processed``, ``skipped``,
+        ``removed`` and ``failed`` files, the ``errors`` per failed path and
+        the elapsed ``seconds``.
+    """
+    directory = os.path.abspath(directory)
+    conn = _open_fingerprint_index(index_path)
+    prefix = os.path.join(directory, "")
+    indexed = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT path, id, size, mtime_ns FROM files WHERE substr(path, 1, ?) = ?",
+            (len(prefix), prefix),
+        )
+        if row[0].endswith(file_ext)
+    }
+    skipped = 0
+
+    def items():
+        nonlocal skipped
+        for entry in _scan_audio_entries(directory, file_ext):
+            stat = entry.stat()
+            row = indexed.pop(entry.path, None)
+            if row is not None and row[1:] == (stat.st_size, stat.st_mtime_ns):
+                skipped += 1
+                continue
+            yield entry.path, stat.st_size, stat.st_mtime_ns, row
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if verbose:
+        from tqdm import tqdm
+
+        progress = tqdm(desc="Fingerprints", unit="file")
+
+    processed = 0
+    errors = {}
+    start_time = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for (path, size, mtime_ns, row), future in _iter_completed(
+                executor,
+                _fingerprint_task,
+                items(),
+                max_workers * 4,
+            ):
+                with conn:
+                    if row is not None:
+                        _remove_file(conn, row[0])
+                    try:
+                        hashes, times = future.result()
+                    except Exception as exc:
+                        errors[path] = str(exc)
+                        if verbose:
+                            pct(f"Error processing {path}: {exc}", "red")
+                    else:
+                        file_id = conn.execute(
+                            "INSERT INTO files (path, size, mtime_ns, hashes) "
+                            "VALUES (?, ?, ?, ?)",
+                            (path, size, mtime_ns, len(hashes)),
+                        ).lastrowid
+                        conn.executemany(
+                            "INSERT INTO hashes VALUES (?, ?, ?)",
+                            zip(hashes.tolist(), [file_id] * len(hashes), times.tolist()),
+                        )
+                        processed += 1
+                if verbose:
+                    progress.update()
+
+        # Whatever is left was not seen during the scan.
+        with conn:
+            for file_id, _, _ in indexed.values():
+                _remove_file(conn, file_id)
+    finally:
+        conn.close()
+        if verbose:
+            progress.close()
+
+    stats = {
+        "processed": processed,
+        "skipped": skipped,
+        "removed": len(indexed),
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": time.perf_counter() - start_time,
+    }
+    if verbose:
+        pct(
+            f"Fingerprinted {processed} files, skipped {skipped}, "
+            f"removed {len(indexed)}, failed {len(errors)}",
+            "green",
+        )
+    return stats
+
+
+def find_duplicates(index_path, path, min_score=0.2):
+    """Return indexed files that duplicate or contain the same audio as ``path``.
+
+    Only files sharing at least one hash with ``path`` are looked at, using
+    the index on hash values, so the cost does not grow with the number of
+    pairs in the corpus. Matches are counted per time offset, and the
+    ``score`` is the share of hashes of the shorter file that line up at the
+    best offset. Exact copies score close to 1.
+
+    Args:
+        index_path: Path of an index built by ``build_fingerprint_index``.
+        path: Audio file to look up. It does not need to be in the index;
+            if it is, its stored hashes are used and it is not reported.
+        min_score: Smallest score reported.
+
+    Returns:
+        A list of dictionaries with the duplicate's ``path``, its ``score``,
+        the number of aligned ``matches`` and ``offset_sec``, the time in
+        the duplicate where ``path`` starts, negative if ``path`` starts
+        earlier. Sorted by score, best first.
+
+    Raises:
+        FileNotFoundError: If there is no index at ``index_path``.
+        ValueError: If the index was written by an older version and needs
+            to be rebuilt with ``build_fingerprint_index``.
+    """
+    path = os.path.abspath(path)
+    conn = _open_fingerprint_index_readonly(index_path)
+    try:
+        row = conn.execute(
+            "SELECT id, hashes FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        conn.execute("CREATE TEMP TABLE query (hash INTEGER, time INTEGER)")
+        if row is not None:
+            file_id, n_hashes = row
+            conn.execute(
+                "INSERT INTO query SELECT hash, time FROM hashes WHERE file_id = ?",
+                (file_id,),
+            )
+        else:
+            file_id = None
+            hashes, times = _fingerprint(path)
+            n_hashes = len(hashes)
+            conn.executemany(
+                "INSERT INTO query VALUES (?, ?)",
+                zip(hashes.tolist(), times.tolist()),
+            )
+
+        offsets = conn.execute(
+            """
+            SELECT h.file_id, h.time - q.time AS delta, COUNT(*)
+            FROM query q JOIN hashes h ON h.hash = q.hash
+            WHERE h.file_id IS NOT ?
+            GROUP BY h.file_id, delta
+            """,
+            (file_id,),
+        ).fetchall()
+
+        counts = {(match_id, delta): count for match_id, delta, count in offsets}
+        best = {}
+        for (match_id, delta), count in counts.items():
+            # Allow one frame of jitter, since the frame grids of the two
+            # files rarely line up exactly.
+            count += counts.get((match_id, delta - 1), 0)
+            count += counts.get((match_id, delta + 1), 0)
+            if count > best.get(match_id, (0, 0))[0]:
+                best[match_id] = (count, delta)
+
+        duplicates = []
+        for match_id, (count, delta) in best.items():
+            match_path, match_hashes = conn.execute(
+                "SELECT path, hashes FROM files WHERE id = ?", (match_id,)
+            ).fetchone()
+            score = min(1.0, count / max(1, min(n_hashes, match_hashes)))
+            if score >= min_score:
+                duplicates.append(
+                    {
+                        "path": match_path,
+                        "score": score,
+                        "matches": count,
+                        "offset_sec": delta * _FP_HOP_SIZE / _FP_SAMPLE_RATE,
+                    }
+                )
+    finally:
+        conn.close()
+
+    duplicates.sort(key=lambda duplicate: duplicate["score"], reverse=True)
+    return duplicates
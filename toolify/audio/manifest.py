@@ -0,0 +1,291 @@
+"""Dataset-wide silence manifests built on ``get_silent_parts``."""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .audio import _iter_audio_files, _iter_completed, get_duration, get_silent_parts
+
+try:
+    from ..tools import pct
+except ImportError:
+    from toolify.tools import pct
+
+__all__ = [
+    "build_silence_manifest",
+]
+
+
+def _require_pyarrow():
+    """Import pyarrow lazily so Toolify does not require it unless needed."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError(
+            "Parquet manifests require 'pyarrow'. "
+            "Install it with: pip install pyarrow"
+        ) from exc
+
+    return pa, pq
+
+
+def _manifest_schema(pa):
+    """Return the Arrow schema of Parquet manifest rows."""
+    silent_part = pa.struct(
+        [
+            ("start_idx", pa.int64()),
+            ("end_idx", pa.int64()),
+            ("start_sec", pa.float64()),
+            ("end_sec", pa.float64()),
+            ("duration", pa.float64()),
+        ]
+    )
+    return pa.schema(
+        [
+            ("path", pa.string()),
+            ("size", pa.int64()),
+            ("mtime_ns", pa.int64()),
+            ("sample_rate", pa.int64()),
+            ("duration", pa.float64()),
+            ("silent_parts", pa.list_(silent_part)),
+        ]
+    )
+
+
+def _file_signature(path):
+    """Return ``(size, mtime_ns)`` used to decide if a file changed."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _silence_manifest_entry(path, silence_kwargs):
+    """Analyse one file in a worker process and return its manifest entry."""
+    size, mtime_ns = _file_signature(path)
+    silent_parts, _, sample_rate = get_silent_parts(
+        path, return_waveform=False, **silence_kwargs
+    )
+    return {
+        "path": path,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sample_rate": sample_rate,
+        "duration": get_duration(path),
+        "silent_parts": [
+            dict(zip(silent_parts.dtype.names, part)) for part in silent_parts.tolist()
+        ],
+    }
+
+
+def _read_manifest(manifest_path, parquet):
+    """Return the entries of an existing manifest, or an empty list."""
+    if not os.path.exists(manifest_path):
+        return []
+
+    if parquet:
+        _, pq = _require_pyarrow()
+        return pq.read_table(manifest_path).to_pylist()
+
+    with open(manifest_path, encoding="utf-8") as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+
+    entries = []
+    for i, line in enumerate(lines):
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            # A run killed while writing leaves a partial last line behind.
+            if i == len(lines) - 1:
+                break
+            raise
+    return entries
+
+
+def _is_current(entry):
+    """Return True if the file behind a manifest entry is unchanged."""
+    try:
+        return _file_signature(entry["path"]) == (entry["size"], entry["mtime_ns"])
+    except OSError:
+        return False
+
+
+class _JsonlWriter:
+    """Appends manifest entries to a JSONL file, one line per entry.
+
+    The kept entries are written to a temporary file that replaces the
+    manifest before new entries are appended, so finished work is never lost
+    if the run is interrupted.
+    """
+
+    def __init__(self, manifest_path, kept_entries):
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in kept_entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, manifest_path)
+        self._file = open(manifest_path, "a", encoding="utf-8")
+
+    def write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Buffers manifest entries and writes them as Parquet row groups.
+
+    Parquet files cannot be appended to, so rows go to a temporary file that
+    replaces the manifest on ``close``.
+    """
+
+    def __init__(self, manifest_path, kept_entries, row_group_size=256):
+        self._pa, pq = _require_pyarrow()
+        self._pq = pq
+        self._manifest_path = manifest_path
+        self._tmp_path = f"{manifest_path}.tmp"
+        self._row_group_size = row_group_size
+        # An explicit schema, since a row group where no file has silence
+        # would otherwise infer ``silent_parts`` as a list of nulls.
+        self._schema = _manifest_schema(self._pa)
+        self._writer = None
+        self._rows = list(kept_entries)
+        self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self._schema)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._tmp_path, self._schema)
+        self._writer.write_table(table)
+        self._rows = []
+
+    def write(self, entry):
+        self._rows.append(entry)
+        if len(self._rows) >= self._row_group_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp_path, self._manifest_path)
+
+
+def build_silence_manifest(
+    directory,
+    manifest_path,
+    file_ext=".wav",
+    max_workers=None,
+    resume=True,
+    verbose=True,
+    **silence_kwargs,
+):
+    """Run ``get_silent_parts`` over a directory and write a manifest.
+
+    Files are analysed in a process pool and each result is written as soon
+    as it finishes, keyed by its absolute path. The manifest format follows
+    the extension of ``manifest_path``: ``.parquet`` writes Parquet
+    (requires ``pyarrow``), anything else writes JSON Lines.
+
+    Args:
+        directory: Directory searched recursively for audio files.
+        manifest_path: Output manifest path.
+        file_ext: Filename extension to include.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+        resume: If True, files already in the manifest with the same size and
+            modification time are skipped. If False, the manifest is rebuilt.
+        verbose: If True, shows progress and prints a throughput summary.
+        **silence_kwargs: Extra keyword arguments passed to ``get_silent_parts``.
+
+    Returns:
+        A dictionary with the counts of ``processed``, ``skipped`` and
+        ``failed`` files, the ``errors`` per failed path, the elapsed
+        ``seconds``, the ``audio_hours`` analysed, and the throughput as
+        ``files_per_sec`` and ``audio_hours_per_sec``.
+    """
+    # Absolute paths keep manifest entries stable across working directories.
+    directory = os.path.abspath(directory)
+    manifest_path = str(manifest_path)
+    parquet = manifest_path.endswith(".parquet")
+
+    kept_entries = []
+    if resume:
+        kept_entries = [
+            entry
+            for entry in _read_manifest(manifest_path, parquet)
+            if _is_current(entry)
+        ]
+    done_paths = {entry["path"] for entry in kept_entries}
+
+    writer_cls = _ParquetWriter if parquet else _JsonlWriter
+    writer = writer_cls(manifest_path, kept_entries)
+
+    paths = (p for p in _iter_audio_files(directory, file_ext) if p not in done_paths)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if verbose:
+        from tqdm import tqdm
+
+        progress = tqdm(desc="Silence manifest", unit="file")
+
+    processed = 0
+    audio_seconds = 0.0
+    errors = {}
+    start_time = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for path, future in _iter_completed(
+                executor,
+                _silence_manifest_entry,
+                paths,
+                max_workers * 4,
+                silence_kwargs,
+            ):
+                try:
+                    entry = future.result()
+                except Exception as exc:
+                    errors[path] = str(exc)
+                    if verbose:
+                        pct(f"Error processing {path}: {exc}", "red")
+                else:
+                    writer.write(entry)
+                    processed += 1
+                    audio_seconds += entry["duration"]
+                if verbose:
+                    progress.update()
+    finally:
+        writer.close()
+        if verbose:
+            progress.close()
+
+    seconds = time.perf_counter() - start_time
+    audio_hours = audio_seconds / 3600
+    stats = {
+        "processed": processed,
+        "skipped": len(kept_entries),
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": seconds,
+        "audio_hours": audio_hours,
+        "files_per_sec": processed / seconds if seconds else 0.0,
+        "audio_hours_per_sec": audio_hours / seconds if seconds else 0.0,
+    }
+
+    if verbose:
+        pct(
+            f"Processed {processed} files ({audio_hours:.2f} h of audio), "
+            f"skipped {len(kept_entries)}, failed {len(errors)}",
+            "green",
+        )
+        pct(
+            f"Throughput: {stats['files_per_sec']:.2f} files/sec, "
+            f"{stats['audio_hours_per_sec']:.4f} audio-hours/sec",
+            "cyan",
+        )
+    return stats
@@ -0,0 +1,531 @@
+"""Bulk spectrogram rendering built on ``compute_spectrogram``."""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import soundfile as sf
+
+from .audio import (
+    _iter_audio_files,
+    _iter_completed,
+    _iter_stft_blocks,
+    _spectrogram_params,
+    compute_spectrogram,
+)
+from .constants import INFERNO_RGB_HEX
+
+try:
+    from ..tools import pct
+except ImportError:
+    from toolify.tools import pct
+
+__all__ = [
+    "build_spectrogram_pyramid",
+    "render_spectrograms",
+    "save_spectrogram_image",
+]
+
+
+_SAVE_PARAMS = {"dpi": 300, "bbox_inches": "tight", "transparent": True}
+
+# Figure reused by every task that runs in a worker process.
+_WORKER_FIGURE = None
+
+_INFERNO_LUT = np.frombuffer(bytes.fromhex(INFERNO_RGB_HEX), np.uint8)
+_INFERNO_LUT = _INFERNO_LUT.reshape(256, 3)
+
+# Matches the colour range of ``get_spectrogram``, which clips at top_db=80.
+_DB_RANGE = 80.0
+_PNG_COMPRESSION = 6
+_PYRAMID_INDEX = "pyramid.json"
+
+
+def _init_render_worker(fig_size):
+    """Create the worker's figure on a headless Agg canvas."""
+    global _WORKER_FIGURE
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=fig_size)
+    FigureCanvasAgg(figure)
+    ax = figure.add_axes((0.1, 0.15, 0.75, 0.75))
+    cax = figure.add_axes((0.87, 0.15, 0.02, 0.75))
+    _WORKER_FIGURE = figure, ax, cax
+
+
+def _render_spectrogram(task, params):
+    """Render one spectrogram with the worker's figure and return its path."""
+    import librosa.display
+
+    path, save_path = task
+    figure, ax, cax = _WORKER_FIGURE
+    ax.clear()
+    cax.clear()
+
+    spectrogram_db, sample_rate = compute_spectrogram(
+        path,
+        params["fft_size"],
+        params["hop_size"],
+        params["window_size"],
+        cache_dir=params["cache_dir"],
+        mono=True,
+    )
+    img = librosa.display.specshow(
+        spectrogram_db,
+        y_axis="log",
+        x_axis="time",
+        sr=sample_rate,
+        hop_length=params["hop_size"],
+        cmap="inferno",
+        ax=ax,
+    )
+    ax.set_xlabel("Time [s]")
+    ax.set_ylabel("Frequency [Hz]")
+    figure.colorbar(img, cax=cax, format="%+2.f dBFS")
+
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    figure.savefig(save_path, **params["save_params"])
+    return save_path
+
+
+def _log_frequency_rows(n_bins, sample_rate, fft_size, height):
+    """Return the frequency bin shown on each image row, top row first.
+
+    Rows are spaced evenly on a log-frequency axis from the first non-zero
+    bin up to the Nyquist frequency.
+    """
+    bin_hz = sample_rate / fft_size
+    freqs = np.geomspace(bin_hz, sample_rate / 2, height)
+    rows = np.rint(freqs / bin_hz).astype(np.intp)
+    return np.clip(rows, 0, n_bins - 1)[::-1]
+
+
+def _write_png(path, rgb):
+    """Write an ``(height, width, 3)`` uint8 array as an RGB PNG file."""
+    height, width, _ = rgb.shape
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0  # "None" filter type for every scanline
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(tag, data):
+        body = tag + data
+        return (
+            struct.pack(">I", len(data))
+            + body
+            + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", header))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), _PNG_COMPRESSION)))
+        f.write(chunk(b"IEND", b""))
+
+
+def save_spectrogram_image(
+    file,
+    save_path=None,
+    fft_size=2048,
+    hop_size=None,
+    window_size=None,
+    height=None,
+    cache_dir=None,
+    mono=False,
+):
+    """Write a log-frequency spectrogram PNG without matplotlib.
+
+    The dB matrix from ``compute_spectrogram`` is mapped through the inferno
+    colormap with a lookup table and written directly as a PNG, with no axes,
+    labels or colorbar. This is meant for bulk dataset previews where
+    ``get_spectrogram`` spends most of its time in matplotlib.
+
+    Args:
+        file: Path to the input audio file.
+        save_path: Output image path. Defaults to the input name with ``.png``.
+        fft_size: Number of samples used for each FFT.
+        hop_size: Samples between frames. Defaults to one quarter of the window.
+        window_size: FFT window length. Defaults to ``fft_size``.
+        height: Image height in pixels. Defaults to the number of frequency
+            bins. The width is one pixel per STFT frame.
+        cache_dir: Optional spectrogram cache directory, see
+            ``compute_spectrogram``.
+        mono: If True, multichannel audio is averaged to mono. Otherwise the
+            channels are stacked top to bottom, each ``height`` pixels tall.
+
+    Returns:
+        The path of the written image.
+    """
+    spectrogram_db, sample_rate = compute_spectrogram(
+        file, fft_size, hop_size, window_size, cache_dir=cache_dir, mono=mono
+    )
+    n_bins = spectrogram_db.shape[-2]
+    rows = _log_frequency_rows(n_bins, sample_rate, fft_size, height or n_bins)
+
+    panels = spectrogram_db[..., rows, :].reshape(-1, spectrogram_db.shape[-1])
+    levels = (panels + _DB_RANGE) * (255 / _DB_RANGE)
+    levels = np.clip(levels, 0, 255).astype(np.uint8)
+
+    if not save_path:
+        save_path = os.path.splitext(os.fspath(file))[0] + ".png"
+    _write_png(save_path, _INFERNO_LUT[levels])
+    return save_path
+
+
+def _render_spectrogram_image(task, params):
+    """Render one spectrogram through the matplotlib-free fast path."""
+    path, save_path = task
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    return save_spectrogram_image(
+        path,
+        save_path,
+        params["fft_size"],
+        params["hop_size"],
+        params["window_size"],
+        height=params["height"],
+        cache_dir=params["cache_dir"],
+        mono=True,
+    )
+
+
+def _spectrogram_tasks(files, output_dir, file_ext, suffix=".png"):
+    """Yield ``(path, save_path)`` pairs for a directory or a list of files."""
+    if isinstance(files, (str, os.PathLike)) and os.path.isdir(files):
+        root = os.fspath(files)
+        paths = _iter_audio_files(root, file_ext)
+    else:
+        root = None
+        paths = (os.fspath(path) for path in files)
+
+    for path in paths:
+        stem = os.path.splitext(path)[0]
+        if output_dir is not None:
+            # Keep the layout below a scanned directory, flatten file lists.
+            name = os.path.relpath(stem, root) if root else os.path.basename(stem)
+            stem = os.path.join(output_dir, name)
+        yield path, stem + suffix
+
+
+def _run_render_pool(
+    tasks, worker, params, max_workers, initializer, initargs, verbose
+):
+    """Run render tasks in a process pool and collect outputs and failures."""
+    max_workers = max_workers or os.cpu_count() or 1
+    rendered = {}
+    failed = {}
+
+    if verbose:
+        from tqdm import tqdm
+
+        progress = tqdm(desc="Spectrograms", unit="file")
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=initializer, initargs=initargs
+        ) as executor:
+            for (path, _), future in _iter_completed(
+                executor, worker, tasks, max_workers * 4, params
+            ):
+                try:
+                    rendered[path] = future.result()
+                except Exception as exc:
+                    failed[path] = str(exc)
+                    if verbose:
+                        pct(f"Error rendering {path}: {exc}", "red")
+                if verbose:
+                    progress.update()
+    finally:
+        if verbose:
+            progress.close()
+
+    return {"rendered": rendered, "failed": failed}
+
+
+def render_spectrograms(
+    files,
+    output_dir=None,
+    file_ext=".wav",
+    fft_size=2048,
+    hop_size=None,
+    window_size=None,
+    fig_size=(10, 4),
+    save_params=None,
+    cache_dir=None,
+    max_workers=None,
+    verbose=True,
+    fast=False,
+    height=None,
+):
+    """Render spectrogram images for many files in parallel.
+
+    Each worker process draws on its own headless Agg figure and reuses it for
+    every file it renders, instead of creating a pyplot figure per image.
+    With ``fast=True`` images are written by ``save_spectrogram_image``
+    instead, without matplotlib, axes or a colorbar. Multichannel files are
+    averaged to mono.
+
+    Args:
+        files: A directory searched recursively, or a list of audio paths.
+        output_dir: Directory for the images. Defaults to next to each input.
+            The layout below a scanned directory is preserved.
+        file_ext: Filename extension to include when ``files`` is a directory.
+        fft_size: Number of samples used for each FFT.
+        hop_size: Samples between frames. Defaults to one quarter of the window.
+        window_size: FFT window length. Defaults to ``fft_size``.
+        fig_size: Matplotlib figure size.
+        save_params: Optional keyword arguments passed to ``savefig``.
+        cache_dir: Optional spectrogram cache directory, see
+            ``compute_spectrogram``.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+        verbose: If True, shows progress and prints failures.
+        fast: If True, use the matplotlib-free raster path.
+        height: Image height in pixels for the fast path.
+
+    Returns:
+        A dictionary with ``rendered`` mapping each input to its image path
+        and ``failed`` mapping each failed input to its error message.
+    """
+    fft_size, hop_size, window_size = _spectrogram_params(
+        fft_size, hop_size, window_size
+    )
+    params = {
+        "fft_size": fft_size,
+        "hop_size": hop_size,
+        "window_size": window_size,
+        "cache_dir": cache_dir,
+        "save_params": save_params or _SAVE_PARAMS,
+        "height": height,
+    }
+    tasks = _spectrogram_tasks(files, output_dir, file_ext)
+    if fast:
+        return _run_render_pool(
+            tasks, _render_spectrogram_image, params, max_workers, None, (), verbose
+        )
+    return _run_render_pool(
+        tasks,
+        _render_spectrogram,
+        params,
+        max_workers,
+        _init_render_worker,
+        (fig_size,),
+        verbose,
+    )
+
+
+def _pyramid_finest_level(file, level_path, params, block_frames):
+    """Write colour indices of one pixel per STFT frame to ``level_path``.
+
+    Only the image rows of each STFT block are kept, as float32 magnitudes
+    in a temporary memory map, until the global peak is known. Returns
+    ``(sample_rate, n_frames)``.
+    """
+    import librosa
+
+    fft_size = params["fft_size"]
+    hop_size = params["hop_size"]
+    height = params["height"]
+
+    with sf.SoundFile(file) as snd:
+        sample_rate = snd.samplerate
+        if snd.frames < fft_size:
+            raise ValueError(
+                f"Audio has {snd.frames} samples, fewer than fft_size={fft_size}"
+            )
+        n_frames = 1 + (snd.frames - fft_size) // hop_size
+        rows = _log_frequency_rows(1 + fft_size // 2, sample_rate, fft_size, height)
+
+        magnitude_path = level_path + ".magnitude.npy"
+        magnitudes = np.lib.format.open_memmap(
+            magnitude_path, mode="w+", dtype=np.float32, shape=(height, n_frames)
+        )
+        peak = 0.0
+        for first, last, magnitude in _iter_stft_blocks(
+            snd, fft_size, hop_size, params["window_size"], n_frames, block_frames
+        ):
+            magnitudes[:, first:last] = magnitude[rows]
+            peak = max(peak, float(magnitude.max()))
+
+    levels = np.lib.format.open_memmap(
+        level_path, mode="w+", dtype=np.uint8, shape=(height, n_frames)
+    )
+    for first in range(0, n_frames, block_frames):
+        block = magnitudes[:, first : first + block_frames]
+        block_db = librosa.amplitude_to_db(block, ref=peak, top_db=None)
+        block = (block_db + _DB_RANGE) * (255 / _DB_RANGE)
+        levels[:, first : first + block_frames] = np.clip(block, 0, 255)
+    levels.flush()
+    del magnitudes, levels
+    os.remove(magnitude_path)
+    return sample_rate, n_frames
+
+
+def _pyramid_coarser_level(level_path, coarse_path, block_columns):
+    """Halve the time resolution of a level by keeping the louder column."""
+    fine = np.load(level_path, mmap_mode="r")
+    height, width = fine.shape
+    coarse = np.lib.format.open_memmap(
+        coarse_path, mode="w+", dtype=np.uint8, shape=(height, (width + 1) // 2)
+    )
+    block_columns += block_columns % 2
+    for first in range(0, width, block_columns):
+        block = fine[:, first : first + block_columns]
+        if block.shape[1] % 2:
+            block = np.pad(block, ((0, 0), (0, 1)))
+        coarse[:, first // 2 : (first + block.shape[1]) // 2] = np.maximum(
+            block[:, 0::2], block[:, 1::2]
+        )
+    coarse.flush()
+
+
+def _render_pyramid_tile(task, tile_width):
+    """Write one tile of a pyramid level as a PNG and return its path."""
+    level_path, column, save_path = task
+    levels = np.load(level_path, mmap_mode="r")
+    tile = levels[:, column * tile_width : (column + 1) * tile_width]
+    _write_png(save_path, _INFERNO_LUT[tile])
+    return save_path
+
+
+def build_spectrogram_pyramid(
+    file,
+    output_dir,
+    fft_size=2048,
+    hop_size=None,
+    window_size=None,
+    tile_width=256,
+    height=256,
+    block_frames=4096,
+    max_workers=None,
+):
+    """Write a zoomable pyramid of spectrogram tiles for a long recording.
+
+    The finest level has one pixel per STFT frame. Each coarser level halves
+    the time resolution, keeping the louder of two neighbouring columns,
+    down to level 0 which fits in a single tile. Tiles are ``tile_width``
+    pixels wide (the last tile of a level can be narrower) and are written
+    as ``<output_dir>/<level>/<column>.png`` with the colours of
+    ``save_spectrogram_image``, so a viewer only loads the tiles it shows.
+
+    STFT frames are computed in blocks of ``block_frames`` as in
+    ``compute_stft_memmap``, and tiles are rendered in a process pool. The
+    pyramid is described in ``pyramid.json``. When it already matches the
+    file's size and modification time and the parameters, the existing
+    tiles are reused and nothing is computed.
+
+    Args:
+        file: Path to the input audio file.
+        output_dir: Directory for the tiles and ``pyramid.json``.
+        fft_size: Number of samples used for each FFT.
+        hop_size: Samples between frames. Defaults to one quarter of the window.
+        window_size: FFT window length. Defaults to ``fft_size``.
+        tile_width: Tile width in pixels.
+        height: Tile height in pixels, on a log-frequency axis.
+        block_frames: Number of STFT frames computed per block.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+
+    Returns:
+        The pyramid description: ``params``, ``sample_rate``, ``n_frames``
+        and ``levels``, a list with the ``level``, ``frames_per_pixel``,
+        ``width`` and number of ``tiles`` of each level, coarsest first. The
+        tile at column ``c`` of a level starts at
+        ``c * tile_width * frames_per_pixel * hop_size / sample_rate``
+        seconds.
+    """
+    fft_size, hop_size, window_size = _spectrogram_params(
+        fft_size, hop_size, window_size
+    )
+    stat = os.stat(file)
+    params = {
+        "fft_size": fft_size,
+        "hop_size": hop_size,
+        "window_size": window_size,
+        "tile_width": tile_width,
+        "height": height,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+    index_path = os.path.join(output_dir, _PYRAMID_INDEX)
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index["params"] == params:
+            return index
+        os.remove(index_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Remove the tiles of an earlier pyramid, so a viewer never mixes them
+    # with tiles rendered for other parameters.
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if name.isdigit() and os.path.isdir(path):
+            shutil.rmtree(path)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+        level_path = os.path.join(tmp_dir, "finest.npy")
+        sample_rate, n_frames = _pyramid_finest_level(
+            file, level_path, params, block_frames
+        )
+
+        # Level 0 is the coarsest and fits in a single tile.
+        n_levels = 1
+        while -(-n_frames // 2 ** (n_levels - 1)) > tile_width:
+            n_levels += 1
+
+        level_paths = {n_levels - 1: level_path}
+        for level in range(n_levels - 2, -1, -1):
+            level_paths[level] = os.path.join(tmp_dir, f"level_{level}.npy")
+            _pyramid_coarser_level(
+                level_paths[level + 1], level_paths[level], block_frames
+            )
+
+        levels = []
+        tasks = []
+        for level in range(n_levels):
+            width = np.load(level_paths[level], mmap_mode="r").shape[1]
+            n_tiles = -(-width // tile_width)
+            levels.append(
+                {
+                    "level": level,
+                    "frames_per_pixel": 2 ** (n_levels - 1 - level),
+                    "width": width,
+                    "tiles": n_tiles,
+                }
+            )
+            os.makedirs(os.path.join(output_dir, str(level)), exist_ok=True)
+            tasks.extend(
+                (
+                    level_paths[level],
+                    column,
+                    os.path.join(output_dir, str(level), f"{column}.png"),
+                )
+                for column in range(n_tiles)
+            )
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for _, future in _iter_completed(
+                executor, _render_pyramid_tile, tasks, max_workers * 4, tile_width
+            ):
+                future.result()
+
+    index = {
+        "params": params,
+        "sample_rate": sample_rate,
+        "n_frames": n_frames,
+        "levels": levels,
+    }
+    # Written last, so an interrupted build is never mistaken for a cached one.
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
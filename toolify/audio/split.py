@@ -0,0 +1,156 @@
+"""Silence-based splitting of audio files built on ``iter_silent_parts``."""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import soundfile as sf
+
+from .audio import _END_MARGIN_INC, _iter_completed, iter_silent_parts
+
+__all__ = [
+    "split_on_silence",
+]
+
+
+def _segment_bounds(silent_parts, n_frames, sample_rate, silence_margin_sec):
+    """Yield ``(start, end)`` frame ranges of the audio between silent parts.
+
+    Silence before the first sound is dropped entirely instead of leaving a
+    margin-sized segment of silence, and silent parts shorter than both
+    margins are not split on.
+    """
+    margin = int(sample_rate * silence_margin_sec)
+    cursor = 0
+    for i, part in enumerate(silent_parts):
+        start = int(part["start_idx"])
+        end = int(part["end_idx"])
+        if start >= end:
+            continue
+        if i == 0:
+            lead = int(margin * _END_MARGIN_INC) if end == n_frames else margin
+            if start - lead <= 0:
+                cursor = end
+                continue
+        if start > cursor:
+            yield cursor, start
+        cursor = end
+    if cursor < n_frames:
+        yield cursor, n_frames
+
+
+def _write_segment(task, subtype):
+    """Copy one frame range of the input into its own file."""
+    input_path, start, end, save_path = task
+    with sf.SoundFile(input_path) as f:
+        f.seek(start)
+        data = f.read(end - start, always_2d=True)
+        sample_rate = f.samplerate
+        if subtype is None and os.path.splitext(save_path)[1].lower() == (
+            os.path.splitext(input_path)[1].lower()
+        ):
+            subtype = f.subtype
+    sf.write(save_path, data, sample_rate, subtype=subtype)
+    return save_path
+
+
+def split_on_silence(
+    input_file_path,
+    output_dir,
+    silence_threshold_db=-40,
+    silence_margin_sec=0.15,
+    min_segment_sec=0.0,
+    segment_ext=None,
+    subtype=None,
+    manifest_path=None,
+    max_workers=8,
+    block_size=65536,
+):
+    """Write the non-silent segments of a file as separate audio files.
+
+    Silent regions are found with ``iter_silent_parts``, so the file is
+    streamed once in blocks and never decoded into memory as a whole. Each
+    segment is then read back with a seek to its first frame and written by
+    a thread pool while detection continues. Segments keep
+    ``silence_margin_sec`` of silence on each side.
+
+    Args:
+        input_file_path: Path to the audio file to split.
+        output_dir: Directory for the segment files, named
+            ``<stem>_<index>.<ext>``.
+        silence_threshold_db: Samples at or below this level are considered silent.
+        silence_margin_sec: Margin applied to detected silence boundaries.
+        min_segment_sec: Segments shorter than this are not written.
+        segment_ext: Extension of the segment files, which selects their
+            format. Defaults to the input's extension.
+        subtype: Optional ``soundfile`` subtype such as ``"PCM_16"``. Defaults
+            to the input's subtype when the format is unchanged.
+        manifest_path: JSON Lines manifest with one entry per segment.
+            Defaults to ``<output_dir>/<stem>_segments.jsonl``.
+        max_workers: Maximum number of threads writing segments.
+        block_size: Number of frames read per block during detection.
+
+    Returns:
+        A list of segment entries in order, each with the segment ``path``,
+        its ``index``, the ``start_idx`` and ``end_idx`` frames in the input,
+        ``start_sec``, ``end_sec``, ``duration`` and ``sample_rate``. The same
+        entries are written to the manifest.
+    """
+    input_file_path = os.fspath(input_file_path)
+    stem, ext = os.path.splitext(os.path.basename(input_file_path))
+    segment_ext = segment_ext or ext
+    os.makedirs(output_dir, exist_ok=True)
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, f"{stem}_segments.jsonl")
+
+    info = sf.info(input_file_path)
+    sample_rate = info.samplerate
+    min_frames = int(min_segment_sec * sample_rate)
+
+    silent_parts = iter_silent_parts(
+        input_file_path,
+        silence_threshold_db,
+        silence_margin_sec,
+        block_size=block_size,
+    )
+    bounds = (
+        (start, end)
+        for start, end in _segment_bounds(
+            silent_parts, info.frames, sample_rate, silence_margin_sec
+        )
+        if end - start >= min_frames
+    )
+    tasks = (
+        (
+            input_file_path,
+            start,
+            end,
+            os.path.join(output_dir, f"{stem}_{index:04d}{segment_ext}"),
+        )
+        for index, (start, end) in enumerate(bounds)
+    )
+
+    segments = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for (_, start, end, _), future in _iter_completed(
+            executor, _write_segment, tasks, max_workers * 4, subtype
+        ):
+            segments.append(
+                {
+                    "path": future.result(),
+                    "start_idx": start,
+                    "end_idx": end,
+                    "start_sec": start / sample_rate,
+                    "end_sec": end / sample_rate,
+                    "duration": (end - start) / sample_rate,
+                    "sample_rate": sample_rate,
+                }
+            )
+
+    segments.sort(key=lambda segment: segment["start_idx"])
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        for index, segment in enumerate(segments):
+            segment = {"index": index, "source": input_file_path, **segment}
+            segments[index] = segment
+            f.write(json.dumps(segment, ensure_ascii=False) + "\n")
+    return segments
@@ -0,0 +1,248 @@
+"""Directory-level transcoding and resampling of audio corpora."""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+from .audio import _iter_audio_files, _iter_completed
+
+try:
+    from ..tools import pct
+except ImportError:
+    from toolify.tools import pct
+
+__all__ = [
+    "transcode_directory",
+]
+
+
+def _is_up_to_date(path, save_path, params):
+    """Return True if ``save_path`` is newer than ``path`` and matches ``params``.
+
+    Only the output's header is read, to compare its sample rate, channels
+    and subtype with the requested ones. The input's header is read when the
+    rate or channels are kept from the input.
+    """
+    try:
+        if os.stat(save_path).st_mtime_ns < os.stat(path).st_mtime_ns:
+            return False
+        out = sf.info(save_path)
+        if params["sample_rate"] is None or params["channels"] is None:
+            info = sf.info(path)
+        sample_rate = params["sample_rate"] or info.samplerate
+        channels = params["channels"] or info.channels
+    except (OSError, RuntimeError):
+        return False
+    return (
+        out.samplerate == sample_rate
+        and out.channels == channels
+        and params["subtype"] in (None, out.subtype)
+    )
+
+
+def _mix_channels(block, channels):
+    """Return a ``(frames, channels)`` block with the requested channel count."""
+    if channels is None or block.shape[1] == channels:
+        return block
+    if channels == 1:
+        return block.mean(axis=1, keepdims=True)
+    if block.shape[1] == 1:
+        return np.repeat(block, channels, axis=1)
+    raise ValueError(
+        f"Cannot convert {block.shape[1]} channels to {channels} channels"
+    )
+
+
+def _transcode_file(task, params):
+    """Stream one file through decode, resample and encode in a worker.
+
+    The output is written to a temporary file that replaces ``save_path``
+    once it is complete, so an interrupted run never leaves a partial file
+    that looks up to date. Returns the duration of the input in seconds.
+    """
+    import soxr
+
+    path, save_path = task
+    info = sf.info(path)
+    in_rate = info.samplerate
+    out_rate = params["sample_rate"] or in_rate
+    channels = params["channels"] or info.channels
+
+    resampler = None
+    if out_rate != in_rate:
+        resampler = soxr.ResampleStream(
+            in_rate, out_rate, channels, dtype="float32", quality=params["quality"]
+        )
+
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    root, ext = os.path.splitext(save_path)
+    tmp_path = f"{root}.{os.getpid()}.tmp{ext}"
+    try:
+        with sf.SoundFile(
+            tmp_path,
+            "w",
+            samplerate=out_rate,
+            channels=channels,
+            subtype=params["subtype"],
+        ) as out:
+            for block in sf.blocks(
+                path, blocksize=params["block_size"], dtype="float32", always_2d=True
+            ):
+                block = _mix_channels(block, params["channels"])
+                if resampler is not None:
+                    block = resampler.resample_chunk(block)
+                out.write(block)
+            if resampler is not None:
+                out.write(
+                    resampler.resample_chunk(
+                        np.empty((0, channels), dtype=np.float32), last=True
+                    )
+                )
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return info.frames / in_rate
+
+
+def transcode_directory(
+    input_dir,
+    output_dir,
+    file_ext=".wav",
+    sample_rate=16000,
+    channels=1,
+    output_ext=".flac",
+    subtype=None,
+    quality="HQ",
+    overwrite=False,
+    max_workers=None,
+    block_size=65536,
+    verbose=True,
+):
+    """Convert every audio file in a directory to one sample rate and format.
+
+    Files are streamed in blocks through decode, resample and encode in a
+    process pool, so memory use does not depend on file length. At most a
+    few tasks per worker are queued at a time. The directory layout below
+    ``input_dir`` is kept in ``output_dir``. Outputs that are newer than
+    their input and already have the requested sample rate, channels and
+    subtype are skipped. A change of ``quality`` alone is not detected, use
+    ``overwrite`` for it.
+
+    Args:
+        input_dir: Directory searched recursively for audio files.
+        output_dir: Directory for the converted files.
+        file_ext: Filename extension of the input files.
+        sample_rate: Target sample rate. ``None`` keeps each file's rate.
+        channels: Target channel count. ``1`` averages the channels to mono
+            and mono input is duplicated to more channels. ``None`` keeps
+            each file's channels.
+        output_ext: Extension of the output files, which selects their
+            format, for example ``.flac`` or ``.wav``.
+        subtype: Optional ``soundfile`` subtype such as ``"PCM_16"``. Defaults
+            to the format's default subtype.
+        quality: ``soxr`` resampling quality: ``"QQ"``, ``"LQ"``, ``"MQ"``,
+            ``"HQ"`` or ``"VHQ"``. ``"HQ"`` matches ``librosa.load``.
+        overwrite: If True, files are converted even when their output is up
+            to date.
+        max_workers: Maximum number of worker processes. Defaults to the
+            number of CPUs.
+        block_size: Number of frames read per block.
+        verbose: If True, shows progress and prints a throughput summary.
+
+    Returns:
+        A dictionary with the counts of ``processed``, ``skipped`` and
+        ``failed`` files, the ``errors`` per failed path, the ``outputs`` per
+        converted path, the elapsed ``seconds``, the ``audio_hours``
+        converted, and the throughput as ``files_per_sec`` and
+        ``audio_hours_per_sec``.
+    """
+    input_dir = os.fspath(input_dir)
+    output_dir = os.fspath(output_dir)
+    if os.path.abspath(input_dir) == os.path.abspath(output_dir) and (
+        output_ext.lower() == file_ext.lower()
+    ):
+        raise ValueError("Output files would overwrite the input files")
+
+    params = {
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "subtype": subtype,
+        "quality": quality,
+        "block_size": block_size,
+    }
+    skipped = 0
+
+    def tasks():
+        nonlocal skipped
+        for path in _iter_audio_files(input_dir, file_ext):
+            stem = os.path.splitext(os.path.relpath(path, input_dir))[0]
+            save_path = os.path.join(output_dir, stem + output_ext)
+            if not overwrite and _is_up_to_date(path, save_path, params):
+                skipped += 1
+                continue
+            yield path, save_path
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if verbose:
+        from tqdm import tqdm
+
+        progress = tqdm(desc="Transcode", unit="file")
+
+    outputs = {}
+    errors = {}
+    audio_seconds = 0.0
+    start_time = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for (path, save_path), future in _iter_completed(
+                executor, _transcode_file, tasks(), max_workers * 4, params
+            ):
+                try:
+                    audio_seconds += future.result()
+                except Exception as exc:
+                    errors[path] = str(exc)
+                    if verbose:
+                        pct(f"Error converting {path}: {exc}", "red")
+                else:
+                    outputs[path] = save_path
+                if verbose:
+                    progress.update()
+    finally:
+        if verbose:
+            progress.close()
+
+    seconds = time.perf_counter() - start_time
+    audio_hours = audio_seconds / 3600
+    processed = len(outputs)
+    stats = {
+        "processed": processed,
+        "skipped": skipped,
+        "failed": len(errors),
+        "errors": errors,
+        "outputs": outputs,
+        "seconds": seconds,
+        "audio_hours": audio_hours,
+        "files_per_sec": processed / seconds if seconds else 0.0,
+        "audio_hours_per_sec": audio_hours / seconds if seconds else 0.0,
+    }
+
+    if verbose:
+        pct(
+            f"Converted {processed} files ({audio_hours:.2f} h of audio), "
+            f"skipped {skipped}, failed {len(errors)}",
+            "green",
+        )
+        pct(
+            f"Throughput: {stats['files_per_sec']:.2f} files/sec, "
+            f"{stats['audio_hours_per_sec']:.4f} audio-hours/sec",
+            "cyan",
+        )
+    return stats
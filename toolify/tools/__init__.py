@@ -5,7 +5,14 @@ from .tools import *
 __all__ = [
     "pct",
     "pat",
+    "pat_many",
+    "shape_arabic",
+    "shape_cache_info",
+    "Style",
+    "buffered_output",
     "print_table",
+    "stream_table",
+    "print_columns",
     "setup_logger",
     "strip_tashkeel",
     "confirm",
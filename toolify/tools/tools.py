@@ -1,16 +1,28 @@
 __all__ = [
     "pct",
     "pat",
+    "pat_many",
+    "shape_arabic",
+    "shape_cache_info",
+    "Style",
+    "buffered_output",
     "print_table",
+    "stream_table",
+    "print_columns",
     "setup_logger",
     "strip_tashkeel",
     "confirm",
 ]
 
 
+import os
 import sys
 import logging
-from typing import Union, Optional, Sequence, Any
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Union, Optional, Sequence, Any, Iterable, TextIO
 from pathlib import Path
 from uuid import uuid4
 from datetime import datetime
@@ -54,6 +66,171 @@ def _resolve_emoji(emoji: str) -> str:
     return EMOS.get(emoji, "")
 
 
+_TTY_CACHE = (None, False)
+
+
+def _supports_color(stream: TextIO) -> bool:
+    """Returns True if ANSI colors should be written to ``stream``.
+
+    ``NO_COLOR`` disables and ``FORCE_COLOR`` forces colors. Otherwise colors
+    are used only for terminals. The ``isatty`` result of the last stream is
+    cached, since it needs a system call.
+    """
+    global _TTY_CACHE
+
+    if os.environ.get("NO_COLOR"):
+        return False
+    if os.environ.get("FORCE_COLOR"):
+        return True
+
+    cached_stream, is_tty = _TTY_CACHE
+    if cached_stream is not stream:
+        try:
+            is_tty = stream.isatty()
+        except (AttributeError, ValueError):
+            is_tty = False
+        _TTY_CACHE = (stream, is_tty)
+    return is_tty
+
+
+class _OutputBuffer:
+    """Collects output text and writes it to a stream in large chunks."""
+
+    def __init__(self, file: TextIO, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.parts:
+            self.file.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+
+
+_OUTPUT_BUFFER = None
+
+
+@contextmanager
+def buffered_output(file: Optional[TextIO] = None, chunk_size: int = 65536):
+    """Collects ``pct`` and ``pat`` output and writes it in large chunks.
+
+    Inside the block, styled output is kept in memory and written once at
+    least ``chunk_size`` characters are pending, and once more when the block
+    exits. Other output, such as plain ``print`` calls, is not buffered and
+    can appear before buffered text.
+
+    Blocks can be nested. A nested block without ``file``, or with the same
+    ``file`` as the enclosing block, adds to the enclosing buffer, so output
+    keeps its order.
+
+    Args:
+        file: Stream to write to. Defaults to ``sys.stdout`` when the block
+            starts.
+        chunk_size: Number of characters collected before each write.
+
+    Yields:
+        None.
+    """
+    global _OUTPUT_BUFFER
+
+    previous = _OUTPUT_BUFFER
+    if previous is not None and (file is None or file is previous.file):
+        yield
+        return
+
+    buffer = _OutputBuffer(sys.stdout if file is None else file, chunk_size)
+    _OUTPUT_BUFFER = buffer
+    try:
+        yield
+    finally:
+        _OUTPUT_BUFFER = previous
+        buffer.flush()
+        buffer.file.flush()
+
+
+def _write_output(text: str) -> None:
+    """Writes styled text to the active output buffer or ``sys.stdout``."""
+    if _OUTPUT_BUFFER is not None:
+        _OUTPUT_BUFFER.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+def _output_stream() -> TextIO:
+    """Returns the stream styled text is currently written to."""
+    if _OUTPUT_BUFFER is not None:
+        return _OUTPUT_BUFFER.file
+    return sys.stdout
+
+
+class Style:
+    """A reusable text style with its escape sequences resolved up front.
+
+    Calling a ``Style`` prints like ``pct`` with the same arguments, without
+    looking up colors and emojis again.
+
+    Args:
+        color: Foreground color key.
+        bcolor: Background color key.
+        emoji: Emoji key printed before the text.
+        end_emoji: Emoji key printed after the text.
+    """
+
+    __slots__ = ("_prefix", "_suffix", "_plain_prefix", "_plain_suffix")
+
+    def __init__(
+        self,
+        color: Union[str, int] = 1,
+        bcolor: Optional[Union[str, int]] = None,
+        emoji: str = "",
+        end_emoji: str = "",
+    ):
+        emoji_char = _resolve_emoji(emoji)
+        end_emoji_char = _resolve_emoji(end_emoji)
+
+        self._plain_prefix = f"{emoji_char} " if emoji_char else ""
+        self._plain_suffix = f" {end_emoji_char}" if end_emoji_char else ""
+        self._prefix = (
+            f"{self._plain_prefix}{_resolve_color(color)}{_resolve_bcolor(bcolor)}"
+        )
+        self._suffix = f"{RESET_COLOR}{self._plain_suffix}"
+
+    def format(self, text: Any, ec: bool = True) -> str:
+        """Returns the styled text.
+
+        Args:
+            text: Text to style.
+            ec: If True, include ANSI colors.
+        """
+        if ec:
+            return f"{self._prefix}{text}{self._suffix}"
+        return f"{self._plain_prefix}{text}{self._plain_suffix}"
+
+    def __call__(self, text: Any, end: str = "\n", ec: bool = True) -> None:
+        """Prints the styled text.
+
+        Args:
+            text: Text to print.
+            end: String appended after the printed text.
+            ec: If True, apply ANSI colors when the output is a terminal.
+        """
+        ec = ec and _supports_color(_output_stream())
+        _write_output(self.format(text, ec) + end)
+
+
+@lru_cache(maxsize=256)
+def _get_style(color, bcolor, emoji, end_emoji) -> Style:
+    return Style(color, bcolor, emoji, end_emoji)
+
+
 def pct(
     text: Any,
     color: Union[str, int] = 1,
@@ -65,6 +242,10 @@ def pct(
 ) -> None:
     """Prints text with optional color, background color, and emojis.
 
+    Colors are left out when the output is not a terminal, or when the
+    ``NO_COLOR`` environment variable is set. Set ``FORCE_COLOR`` to keep
+    them. Styles are compiled once per combination of arguments.
+
     Args:
         text: Text to print.
         ec: If True, apply ANSI colors.
@@ -74,27 +255,7 @@ def pct(
         end_emoji: Emoji key printed after the text.
         end: String appended after the printed text.
     """
-    if ec:
-        color_code = _resolve_color(color)
-        bcolor_code = _resolve_bcolor(bcolor)
-        reset_code = RESET_COLOR
-    else:
-        color_code = ""
-        bcolor_code = ""
-        reset_code = ""
-
-    emoji_char = _resolve_emoji(emoji)
-    end_emoji_char = _resolve_emoji(end_emoji)
-
-    formatted_text = f"{color_code}{bcolor_code}{text}{reset_code}"
-
-    if emoji_char:
-        formatted_text = f"{emoji_char} {formatted_text}"
-
-    if end_emoji_char:
-        formatted_text = f"{formatted_text} {end_emoji_char}"
-
-    print(formatted_text, end=end)
+    _get_style(color, bcolor, emoji, end_emoji)(text, end=end, ec=ec)
 
 
 _ARABIC_RESHAPER = None
@@ -125,6 +286,72 @@ def _get_arabic_reshaper():
     return _ARABIC_RESHAPER
 
 
+_BIDI_GET_DISPLAY = None
+
+# Number of distinct strings whose shaped display form is kept.
+_SHAPE_CACHE_SIZE = 4096
+
+
+def _get_bidi_display():
+    """Lazily imports and returns ``bidi.algorithm.get_display``."""
+    global _BIDI_GET_DISPLAY
+
+    if _BIDI_GET_DISPLAY is not None:
+        return _BIDI_GET_DISPLAY
+
+    try:
+        from bidi.algorithm import get_display
+    except ImportError as exc:
+        raise ImportError(
+            "pat() requires 'python-bidi'. " "Install it with: pip install python-bidi"
+        ) from exc
+
+    _BIDI_GET_DISPLAY = get_display
+    return _BIDI_GET_DISPLAY
+
+
+@lru_cache(maxsize=_SHAPE_CACHE_SIZE)
+def _shape_cached(text: str) -> str:
+    return _get_bidi_display()(_get_arabic_reshaper().reshape(text))
+
+
+def shape_arabic(texts: Union[str, Iterable[Any]]) -> Union[str, list[str]]:
+    """Reshapes Arabic text and applies bidirectional display.
+
+    Shaped strings are kept in a bounded LRU cache, so repeated labels and
+    headers are only shaped once. See ``shape_cache_info`` for its stats.
+
+    Args:
+        texts: A string, or an iterable of values to shape. Non-string values
+            are converted with ``str``.
+
+    Returns:
+        The display string for a single string, otherwise a list of display
+        strings in the same order.
+    """
+    if isinstance(texts, str):
+        return _shape_cached(texts)
+    return [_shape_cached(str(text)) for text in texts]
+
+
+def shape_cache_info() -> dict:
+    """Returns the stats of the Arabic shaping cache.
+
+    Returns:
+        A dictionary with the cache ``hits`` and ``misses``, the ``hit_rate``
+        between 0 and 1, and the current ``size`` and ``maxsize``.
+    """
+    info = _shape_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
+
+
 def pat(
     text: str,
     color: Union[str, int] = 1,
@@ -145,28 +372,88 @@ def pat(
         end: String appended after the printed text.
         ec: If True, apply ANSI colors.
     """
-    try:
-        from bidi.algorithm import get_display
-    except ImportError as exc:
-        raise ImportError(
-            "pat() requires 'python-bidi'. " "Install it with: pip install python-bidi"
-        ) from exc
+    _get_style(color, bcolor, emoji, end_emoji)(
+        _shape_cached(str(text)), end=end, ec=ec
+    )
+
+
+def pat_many(
+    texts: Iterable[Any],
+    color: Union[str, int] = 1,
+    bcolor: Optional[Union[str, int]] = None,
+    emoji: str = "",
+    end_emoji: str = "",
+    end: str = "\n",
+    ec: bool = True,
+) -> None:
+    """Prints several Arabic lines with one style and a single write.
+
+    Each text is shaped as by ``pat``, through the same cache, and ``end``
+    follows every line.
+
+    Args:
+        texts: Iterable of Arabic texts to print. A single string is printed
+            as one line.
+        color: Foreground color key.
+        bcolor: Background color key.
+        emoji: Emoji key printed before each text.
+        end_emoji: Emoji key printed after each text.
+        end: String appended after each printed text.
+        ec: If True, apply ANSI colors.
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+    style = _get_style(color, bcolor, emoji, end_emoji)
+    ec = ec and _supports_color(_output_stream())
+    _write_output(
+        "".join(style.format(text, ec) + end for text in shape_arabic(texts))
+    )
+
+
+def _normalize_row(row: Sequence[Any], n_columns: int, idx: int) -> list[str]:
+    """Converts a row to strings, padding short rows with empty cells."""
+    cells = [str(item) for item in row]
+
+    if len(cells) > n_columns:
+        raise ValueError(
+            f"Row {idx} has {len(cells)} columns, but expected at most {n_columns}"
+        )
+
+    if len(cells) < n_columns:
+        cells.extend([""] * (n_columns - len(cells)))
+
+    return cells
+
+
+def _table_borders(style_chars: Sequence[str], col_widths: Sequence[int]):
+    """Returns the top border, separator line, and bottom border of a table."""
+    line_const = [style_chars[1] * (width + 2) for width in col_widths]
 
-    reshaper = _get_arabic_reshaper()
-    reshaped_text = reshaper.reshape(str(text))
-    displayed_text = get_display(reshaped_text)
-
-    pct(
-        displayed_text,
-        ec=ec,
-        color=color,
-        bcolor=bcolor,
-        emoji=emoji,
-        end_emoji=end_emoji,
-        end=end,
+    top_border = style_chars[0] + style_chars[9].join(line_const) + style_chars[2]
+    separator_line = style_chars[6] + style_chars[7].join(line_const) + style_chars[8]
+    bottom_border = style_chars[4] + style_chars[10].join(line_const) + style_chars[5]
+    return top_border, separator_line, bottom_border
+
+
+def _row_template(col_widths: Sequence[int], border: str) -> str:
+    """Builds a ``str.format`` template for one table line."""
+    border = border.replace("{", "{{").replace("}", "}}")
+    return (
+        border
+        + " "
+        + "".join(f"{{:<{width}}} {border} " for width in col_widths)
     )
 
 
+def _get_table_style(style: int) -> Sequence[str]:
+    if style not in TABLE_STYLES:
+        raise ValueError(
+            f"Invalid table style: {style}. "
+            f"Available styles are: {list(TABLE_STYLES.keys())}"
+        )
+    return TABLE_STYLES[style]
+
+
 def print_table(
     headers: Sequence[Any],
     rows: Sequence[Sequence[Any]],
@@ -188,69 +475,252 @@ def print_table(
         print("Empty data")
         return
 
-    if style not in TABLE_STYLES:
-        raise ValueError(
-            f"Invalid table style: {style}. "
-            f"Available styles are: {list(TABLE_STYLES.keys())}"
-        )
-
-    # Normalize rows:
-    # - Short rows are padded with empty strings.
-    # - Long rows raise an error.
-    normalized_rows = []
-    for idx, row in enumerate(rows):
-        row = list(row)
-
-        if len(row) > len(headers):
-            raise ValueError(
-                f"Row {idx} has {len(row)} columns, but expected at most {len(headers)}"
-            )
-
-        if len(row) < len(headers):
-            row = row + [""] * (len(headers) - len(row))
+    style_chars = _get_table_style(style)
 
-        normalized_rows.append(row)
+    # Convert every cell to a string once, padding short rows.
+    header_cells = [str(header) for header in headers]
+    normalized_rows = [
+        _normalize_row(row, len(headers), idx) for idx, row in enumerate(rows)
+    ]
 
     # Calculate maximum width for each column.
-    col_widths = [len(str(header)) for header in headers]
+    col_widths = [len(header) for header in header_cells]
 
     for row in normalized_rows:
         for i, item in enumerate(row):
-            col_widths[i] = max(col_widths[i], len(str(item)))
+            col_widths[i] = max(col_widths[i], len(item))
 
-    style_chars = TABLE_STYLES[style]
+    top_border, separator_line, bottom_border = _table_borders(style_chars, col_widths)
+    template = _row_template(col_widths, style_chars[3])
 
-    # Build table components.
-    line_const = [style_chars[1] * (width + 2) for width in col_widths]
+    lines = [top_border, template.format(*header_cells).rstrip(), separator_line]
+    for idx, row in enumerate(normalized_rows):
+        if separator and idx:
+            lines.append(separator_line)
+        lines.append(template.format(*row).rstrip())
+    lines.append(bottom_border)
 
-    top_border = style_chars[0] + style_chars[9].join(line_const) + style_chars[2]
-    separator_line = style_chars[6] + style_chars[7].join(line_const) + style_chars[8]
-    bottom_border = style_chars[4] + style_chars[10].join(line_const) + style_chars[5]
+    # One write for the whole table instead of one print per line.
+    sys.stdout.write("\n".join(lines) + "\n")
 
-    # Print top border.
-    print(top_border)
 
-    # Print header row.
-    header_row = style_chars[3] + " "
-    for i, header in enumerate(headers):
-        header_row += f"{str(header):<{col_widths[i]}} {style_chars[3]} "
-    print(header_row.rstrip())
+def _fit_cell(cell: str, width: int) -> str:
+    """Truncates a cell that is wider than its column, marking the cut with …."""
+    if len(cell) <= width:
+        return cell
+    return cell[: width - 1] + "…" if width else ""
 
-    print(separator_line)
 
-    # Print data rows.
-    for idx, row in enumerate(normalized_rows):
-        row_str = style_chars[3] + " "
+def stream_table(
+    headers: Sequence[Any],
+    rows: Iterable[Sequence[Any]],
+    style: int = 1,
+    separator: bool | None = None,
+    widths: Optional[Sequence[int]] = None,
+    sample_size: int = 1000,
+    file: Optional[TextIO] = None,
+    chunk_rows: int = 1000,
+) -> int:
+    """Writes a table from any iterable of rows with bounded memory.
+
+    Column widths are fixed before the body is written: either given by
+    ``widths`` or measured on the headers and the first ``sample_size``
+    rows. Cells wider than their column are truncated and end with ``…``.
+    Lines are written to ``file`` in chunks of ``chunk_rows`` rows, so only
+    the sample and one chunk are held in memory. The output matches
+    ``print_table`` when no cell needs truncating.
+
+    Short rows are padded with empty strings.
+    Rows with more columns than headers raise a ValueError.
 
-        for i, item in enumerate(row):
-            row_str += f"{str(item):<{col_widths[i]}} {style_chars[3]} "
+    Args:
+        headers: Table column headers.
+        rows: Table rows, for example a generator or a database cursor.
+        style: Table style ID from TABLE_STYLES.
+        separator: If True, writes a separator line between rows.
+        widths: Optional fixed width for each column.
+        sample_size: Number of leading rows used to measure the widths when
+            ``widths`` is not given.
+        file: File-like object to write to. Defaults to ``sys.stdout``.
+        chunk_rows: Number of rows formatted before each write.
+
+    Returns:
+        The number of rows written.
+    """
+    file = sys.stdout if file is None else file
+    style_chars = _get_table_style(style)
+
+    rows = iter(rows)
+    sample = [] if widths is not None else list(islice(rows, sample_size))
+    if not headers or (widths is None and not sample):
+        file.write("Empty data\n")
+        return 0
+
+    n_columns = len(headers)
+    header_cells = [str(header) for header in headers]
+    sample = [_normalize_row(row, n_columns, idx) for idx, row in enumerate(sample)]
+
+    if widths is None:
+        col_widths = [len(header) for header in header_cells]
+        for row in sample:
+            for i, item in enumerate(row):
+                col_widths[i] = max(col_widths[i], len(item))
+    else:
+        if len(widths) != n_columns:
+            raise ValueError(
+                f"Got {len(widths)} widths for {n_columns} columns"
+            )
+        col_widths = list(widths)
+        header_cells = [
+            _fit_cell(cell, width) for cell, width in zip(header_cells, col_widths)
+        ]
+
+    top_border, separator_line, bottom_border = _table_borders(style_chars, col_widths)
+    template = _row_template(col_widths, style_chars[3])
+
+    lines = [top_border, template.format(*header_cells).rstrip(), separator_line]
+    count = 0
+    for idx, row in enumerate(chain(sample, rows)):
+        if idx >= len(sample):
+            # Sampled rows already fit, later rows may not.
+            row = _normalize_row(row, n_columns, idx)
+            row = [_fit_cell(cell, width) for cell, width in zip(row, col_widths)]
+        if separator and idx:
+            lines.append(separator_line)
+        lines.append(template.format(*row).rstrip())
+        count += 1
+
+        if count % chunk_rows == 0:
+            file.write("\n".join(lines) + "\n")
+            lines = []
+
+    if not count:
+        file.write("Empty data\n")
+        return 0
+
+    lines.append(bottom_border)
+    file.write("\n".join(lines) + "\n")
+    return count
+
+
+def _table_columns(data: Any, headers: Optional[Sequence[Any]]):
+    """Returns ``(names, columns)`` with one NumPy array per column."""
+    import numpy as np
+
+    if hasattr(data, "column_names") and hasattr(data, "column"):
+        # pyarrow.Table
+        names = list(data.column_names)
+        columns = [data.column(i).to_numpy() for i in range(len(names))]
+    elif hasattr(data, "columns") and hasattr(data, "iloc"):
+        # pandas.DataFrame
+        names = list(data.columns)
+        columns = [data.iloc[:, i].to_numpy() for i in range(len(names))]
+    elif isinstance(data, Mapping):
+        names = list(data)
+        columns = [np.asarray(data[name]) for name in names]
+    else:
+        array = np.asarray(data)
+        if array.ndim != 2:
+            raise ValueError(
+                f"Expected a 2-D array, a mapping of columns, a DataFrame, or an "
+                f"Arrow table, got an array with {array.ndim} dimensions"
+            )
+        names = list(range(array.shape[1]))
+        columns = list(array.T)
+
+    if headers is not None:
+        if len(headers) != len(columns):
+            raise ValueError(f"Got {len(headers)} headers for {len(columns)} columns")
+        names = list(headers)
 
-        print(row_str.rstrip())
+    lengths = {len(column) for column in columns}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return names, columns
 
-        if separator and idx < len(normalized_rows) - 1:
-            print(separator_line)
 
-    print(bottom_border)
+def print_columns(
+    data: Any,
+    headers: Optional[Sequence[Any]] = None,
+    style: int = 1,
+    separator: bool | None = None,
+    file: Optional[TextIO] = None,
+) -> None:
+    """Prints a table from column arrays with vectorized formatting.
+
+    Each column is converted to strings, padded, and joined in whole-array
+    NumPy operations instead of per cell, and the table is written with a
+    single call. The borders match ``print_table``. Values are formatted as
+    ``ndarray.astype(str)`` formats them.
+
+    Args:
+        data: A mapping of column name to array-like, a pandas DataFrame, a
+            pyarrow Table, or a 2-D array of rows.
+        headers: Optional column headers. Defaults to the column names, or
+            to ``0``, ``1``, ... for a 2-D array.
+        style: Table style ID from TABLE_STYLES.
+        separator: If True, prints a separator line between rows.
+        file: File-like object to write to. Defaults to ``sys.stdout``.
+    """
+    import numpy as np
+
+    file = sys.stdout if file is None else file
+    style_chars = _get_table_style(style)
+    names, columns = _table_columns(data, headers)
+
+    if not columns or not len(columns[0]):
+        file.write("Empty data\n")
+        return
+
+    header_cells = [str(name) for name in names]
+    cells = [np.asarray(column).astype(str) for column in columns]
+    col_widths = [
+        max(len(header), int(np.char.str_len(column).max()))
+        for header, column in zip(header_cells, cells)
+    ]
+
+    top_border, separator_line, bottom_border = _table_borders(style_chars, col_widths)
+    border = style_chars[3]
+    header_line = _row_template(col_widths, border).format(*header_cells).rstrip()
+
+    # Lay every row out in one grid of UTF-32 code points: the padded cells
+    # are copied in column by column, then the grid is decoded at once.
+    n_rows = len(cells[0])
+    line_width = len(separator_line)
+    grid = np.empty((n_rows, line_width + 1), dtype=np.uint32)
+    grid[:, 0] = ord(border)
+    grid[:, -1] = ord("\n")
+    pos = 1
+    for column, width in zip(cells, col_widths):
+        grid[:, pos] = ord(" ")
+        if width:
+            padded = np.char.ljust(column, width).astype(f"<U{width}")
+            grid[:, pos + 1 : pos + 1 + width] = padded.view(np.uint32).reshape(
+                n_rows, width
+            )
+        grid[:, pos + 1 + width] = ord(" ")
+        grid[:, pos + 2 + width] = ord(border)
+        pos += width + 3
+
+    if border.isspace():
+        # Trailing blanks are stripped from every row, as in print_table.
+        lines = grid[:, :-1].copy().view(f"<U{line_width}").ravel()
+        row_joiner = f"\n{separator_line}\n" if separator else "\n"
+        body = row_joiner.join(np.char.rstrip(lines).tolist()) + "\n"
+    else:
+        if separator:
+            separator_row = np.frombuffer(
+                (separator_line + "\n").encode("utf-32-le"), dtype=np.uint32
+            )
+            interleaved = np.empty((2 * n_rows - 1, line_width + 1), dtype=np.uint32)
+            interleaved[0::2] = grid
+            interleaved[1::2] = separator_row
+            grid = interleaved
+        body = grid.tobytes().decode("utf-32-le")
+
+    file.write(
+        f"{top_border}\n{header_line}\n{separator_line}\n{body}{bottom_border}\n"
+    )
 
 
 def setup_logger(